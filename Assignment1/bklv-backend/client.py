@@ -1,4 +1,5 @@
 import socket
+import stat
 import threading
 import json
 import shutil
@@ -8,8 +9,21 @@ import shlex
 import time
 import argparse
 import platform
+import queue
+import itertools
 from datetime import datetime
 
+# orjson (optional) for pre-serialized metadata rows
+try:
+    import orjson
+    def json_bytes(obj):
+        return orjson.dumps(obj)
+    json_loads = orjson.loads
+except ImportError:
+    def json_bytes(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+    json_loads = json.loads
+
 # Import adaptive heartbeat
 try:
     from optimizations.adaptive_heartbeat import AdaptiveHeartbeat, ClientState
@@ -82,6 +96,34 @@ def get_local_ip(target_host='8.8.8.8', target_port=80):
         print(f"[WARN] Could not detect local IP, using 127.0.0.1 (P2P may not work across machines)")
         return '127.0.0.1'
 
+_PLATFORM = platform.system()
+
+def metadata_from_stat(stat_info, file_path):
+    """
+    Build the metadata dict from an existing os.stat() result (no extra syscalls)
+    
+    Returns:
+        dict with: size, modified, created, path
+    """
+    # Created/birth time (platform-specific)
+    if _PLATFORM == 'Windows':
+        # Windows: st_ctime is creation time
+        created = stat_info.st_ctime
+    elif _PLATFORM == 'Darwin':  # macOS
+        # macOS: st_birthtime is creation time
+        created = getattr(stat_info, 'st_birthtime', stat_info.st_ctime)
+    else:
+        # Linux: st_ctime is metadata change time, not creation time
+        # Use modified time as fallback
+        created = stat_info.st_mtime
+    
+    return {
+        'size': stat_info.st_size,
+        'modified': stat_info.st_mtime,
+        'created': created,
+        'path': os.path.abspath(file_path)
+    }
+
 def get_file_metadata_crossplatform(file_path):
     """
     Get file metadata in a cross-platform way (Windows, macOS, Linux)
@@ -90,38 +132,109 @@ def get_file_metadata_crossplatform(file_path):
         dict with: size, modified, created, path
     """
     try:
-        stat_info = os.stat(file_path)
-        
-        # Size in bytes
-        size = stat_info.st_size
-        
-        # Modified time (works on all platforms)
-        modified = stat_info.st_mtime
-        
-        # Created/birth time (platform-specific)
-        if platform.system() == 'Windows':
-            # Windows: st_ctime is creation time
-            created = stat_info.st_ctime
-        elif platform.system() == 'Darwin':  # macOS
-            # macOS: st_birthtime is creation time
-            created = stat_info.st_birthtime if hasattr(stat_info, 'st_birthtime') else stat_info.st_ctime
-        else:
-            # Linux: st_ctime is metadata change time, not creation time
-            # Use modified time as fallback
-            created = stat_info.st_mtime
-        
-        return {
-            'size': size,
-            'modified': modified,
-            'created': created,
-            'path': os.path.abspath(file_path)
-        }
+        return metadata_from_stat(os.stat(file_path), file_path)
     except Exception as e:
         raise Exception(f"Failed to get file metadata: {e}")
 
+# Short-lived cache of (stat_result, readable) per path, for endpoints the UI polls
+# (validate-file, download) and for peer GETs. Writers call invalidate_stat(path).
+STAT_CACHE_TTL = 1.0
+STAT_CACHE_SIZE = 4096
+_stat_cache = {}
+_stat_cache_lock = threading.Lock()
+
+def stat_cached(path):
+    """
+    os.stat(path) + os.access(path, R_OK), cached for STAT_CACHE_TTL seconds
+    
+    Returns:
+        (stat_result or None if missing, readable)
+    """
+    now = time.monotonic()
+    entry = _stat_cache.get(path)
+    if entry is not None and entry[0] > now:
+        return entry[1], entry[2]
+    
+    try:
+        st = os.stat(path)
+    except OSError:
+        st = None
+    readable = st is not None and stat.S_ISREG(st.st_mode) and os.access(path, os.R_OK)
+    
+    with _stat_cache_lock:
+        if len(_stat_cache) >= STAT_CACHE_SIZE:
+            _stat_cache.clear()
+        _stat_cache[path] = (now + STAT_CACHE_TTL, st, readable)
+    return st, readable
+
+def invalidate_stat(path):
+    """Drop the cached stat for path (call after creating/changing the file)"""
+    with _stat_cache_lock:
+        _stat_cache.pop(path, None)
+
+class VersionedDict(dict):
+    """
+    dict that bumps .version on every mutation (used for ETags of file lists).
+    FileMetadata values also bump it when one of their fields changes, so the
+    version of one client's lists doesn't move with other clients' files.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+        for value in self.values():
+            self._adopt(value)
+    
+    def _bump(self):
+        self.version += 1
+    
+    def _adopt(self, value):
+        add_owner = getattr(value, '_add_owner', None)
+        if add_owner is not None:
+            add_owner(self)
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._adopt(value)
+        self._bump()
+    
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._bump()
+    
+    def pop(self, *args):
+        result = super().pop(*args)
+        self._bump()
+        return result
+    
+    def popitem(self):
+        result = super().popitem()
+        self._bump()
+        return result
+    
+    def setdefault(self, key, default=None):
+        result = super().setdefault(key, default)
+        self._adopt(result)
+        self._bump()
+        return result
+    
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        for value in self.values():
+            self._adopt(value)
+        self._bump()
+    
+    def clear(self):
+        super().clear()
+        self._bump()
+
 class FileMetadata:
     """Tracks file metadata for local, published, and network files"""
+    # Whole seconds are all the UI shows and duplicate checks allow 2s slack;
+    # ints also encode to about half the JSON bytes of float timestamps
+    TIMESTAMP_FIELDS = frozenset(('modified', 'created', 'added_at', 'published_at'))
     def __init__(self, name, size, modified, path=None, is_published=False, created=None, added_at=None, published_at=None):
+        # VersionedDicts holding this entry; empty while __init__ sets the fields
+        object.__setattr__(self, '_owners', ())
         self.name = name
         self.size = size
         self.modified = modified  # File's last modified time (from filesystem)
@@ -131,17 +244,65 @@ class FileMetadata:
         self.added_at = added_at  # When file was added to local tracking
         self.published_at = published_at  # When file was published to network
     
+    def __setattr__(self, attr, value):
+        if value is not None and attr in FileMetadata.TIMESTAMP_FIELDS:
+            value = int(value)
+        # Any field change invalidates the cached dict view
+        object.__setattr__(self, attr, value)
+        object.__setattr__(self, '_dict_view', None)
+        object.__setattr__(self, '_json_row', None)
+        object.__setattr__(self, '_json_row_brief', None)
+        for owner in self._owners:
+            owner._bump()
+    
+    def _add_owner(self, owner):
+        """Called by VersionedDict when this entry is stored in it"""
+        # Identity check: VersionedDicts compare by content
+        if not any(o is owner for o in self._owners):
+            object.__setattr__(self, '_owners', self._owners + (owner,))
+    
+    @property
+    def as_dict(self):
+        """
+        Cached dict view of the metadata (rebuilt only after a field changes).
+        Shared between callers - treat as read-only, use to_dict() for a copy.
+        """
+        view = self._dict_view
+        if view is None:
+            view = {
+                'name': self.name,
+                'size': self.size,
+                'modified': self.modified,
+                'created': self.created,
+                'path': self.path,
+                'is_published': self.is_published,
+                'added_at': self.added_at,
+                'published_at': self.published_at
+            }
+            object.__setattr__(self, '_dict_view', view)
+        return view
+    
+    def to_json_bytes(self, with_path=True):
+        """
+        as_dict serialized to compact JSON bytes (cached until a field changes)
+        
+        Args:
+            with_path: Include the absolute 'path' field (listings leave it out)
+        """
+        if with_path:
+            row = self._json_row
+            if row is None:
+                row = json_bytes(self.as_dict)
+                object.__setattr__(self, '_json_row', row)
+        else:
+            row = self._json_row_brief
+            if row is None:
+                row = json_bytes({k: v for k, v in self.as_dict.items() if k != 'path'})
+                object.__setattr__(self, '_json_row_brief', row)
+        return row
+    
     def to_dict(self):
-        return {
-            'name': self.name,
-            'size': self.size,
-            'modified': self.modified,
-            'created': self.created,
-            'path': self.path,
-            'is_published': self.is_published,
-            'added_at': self.added_at,
-            'published_at': self.published_at
-        }
+        return dict(self.as_dict)
     
     def matches_metadata(self, other_size, other_modified, tolerance_seconds=2):
         """
@@ -175,23 +336,68 @@ class FileMetadata:
         if not self.path:
             return False, "No file path specified"
         
+        st, readable = stat_cached(self.path)
+        
         # Check if path exists
-        if not os.path.exists(self.path):
+        if st is None:
             return False, f"File not found: {self.path}"
         
         # Check if it's a file (not directory)
-        if not os.path.isfile(self.path):
+        if not stat.S_ISREG(st.st_mode):
             return False, f"Path is not a file: {self.path}"
         
         # Check if readable
-        if not os.access(self.path, os.R_OK):
+        if not readable:
             return False, f"File is not readable: {self.path}"
         
         return True, None
 
+# Write-behind queue for per-file .meta.json writes.
+# Callers enqueue (client, fname) and return immediately; a single daemon thread
+# coalesces everything queued within METADATA_FLUSH_INTERVAL and writes each
+# (client, fname) pair once, so bulk adds don't pay one disk write per call.
+METADATA_FLUSH_INTERVAL = 0.1
+_metadata_queue = queue.Queue()
+_metadata_writer_lock = threading.Lock()
+_metadata_writer_started = False
+
+def _metadata_writer():
+    """Drain _metadata_queue in batches, deduplicating by (client, fname)"""
+    while True:
+        first = _metadata_queue.get()
+        batch = [first]
+        deadline = time.monotonic() + METADATA_FLUSH_INTERVAL
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_metadata_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        pending = {}
+        for client, fname in batch:
+            pending[(id(client), fname)] = (client, fname)
+        
+        for client, fname in pending.values():
+            client._save_file_metadata(fname)
+        
+        for _ in batch:
+            _metadata_queue.task_done()
+
+def enqueue_file_metadata(client, fname):
+    """Schedule a write of client's metadata for fname on the background writer"""
+    global _metadata_writer_started
+    if not _metadata_writer_started:
+        with _metadata_writer_lock:
+            if not _metadata_writer_started:
+                threading.Thread(target=_metadata_writer, daemon=True).start()
+                _metadata_writer_started = True
+    _metadata_queue.put((client, fname))
+
 def send_json(conn, obj):
-    data = json.dumps(obj) + '\n'
-    conn.sendall(data.encode())
+    conn.sendall(json_bytes(obj) + b'\n')
 
 def recv_json(conn):
     buf = b''
@@ -202,7 +408,45 @@ def recv_json(conn):
         buf += chunk
         if b'\n' in buf:
             line, rest = buf.split(b'\n', 1)
-            return json.loads(line.decode())
+            return json_loads(line)
+
+# Peer downloads are received into one reusable buffer and handed to disk in
+# blocks of this size: ~4x fewer write()/progress updates than per-recv writes
+PEER_RECV_BATCH = 1 << 20
+
+def recv_into_batches(sock, first, total_size, write, batch_size=PEER_RECV_BATCH):
+    """
+    Receive total_size bytes of a peer transfer, passing them to write() in batches
+    
+    Args:
+        sock: Connected peer socket
+        first: Body bytes already read together with the header line
+        total_size: Number of body bytes announced by the peer
+        write: Callable taking a bytes-like block (file.write, FetchSession.write_chunk)
+        batch_size: Size of the reusable receive buffer
+    
+    Returns:
+        Number of bytes received (less than total_size if the peer hung up)
+    """
+    first = first[:total_size]
+    received = len(first)
+    if first:
+        write(first)
+    buf = bytearray(min(batch_size, max(total_size - received, 1)))
+    view = memoryview(buf)
+    filled = 0
+    while received < total_size:
+        n = sock.recv_into(view[filled:], min(len(buf) - filled, total_size - received))
+        if not n:
+            break
+        filled += n
+        received += n
+        if filled == len(buf):
+            write(view)
+            filled = 0
+    if filled:
+        write(view[:filled])
+    return received
 
 class PeerServer(threading.Thread):
     def __init__(self, listen_port, client_ref):
@@ -287,24 +531,23 @@ class PeerServer(threading.Thread):
                     
                     bytes_sent = 0
                     last_progress_report = 0
-                    chunks_read = 0
                     
                     with open(fpath, 'rb') as f:
-                        while True:
+                        while bytes_sent < size:
                             # Check if client is shutting down
                             if not self.client_ref.running:
                                 print(f"[PEER] Transfer of '{fname}' interrupted - client shutting down")
                                 conn.sendall(b"ERROR interrupted\n")
                                 return
                             
-                            chunk = f.read(chunk_size)
-                            chunks_read += 1
-                            if chunks_read <= 3:  # Debug first 3 chunks
-                                print(f"[PEER DEBUG] Chunk {chunks_read}: read {len(chunk)} bytes")
-                            if not chunk:
-                                break
-                            conn.sendall(chunk)
-                            bytes_sent += len(chunk)
+                            # Zero-copy: sendfile(2) moves page cache -> socket in the
+                            # kernel (socket.sendfile falls back to send() elsewhere).
+                            # Sliced so shutdown/progress are checked per chunk; never
+                            # past the announced LENGTH even if the file grew meanwhile.
+                            sent = conn.sendfile(f, bytes_sent, min(chunk_size, size - bytes_sent))
+                            if not sent:
+                                break  # File shrank since LENGTH was sent
+                            bytes_sent += sent
                             
                             # Progress reporting for large files (every 10%)
                             if size > 10*1024*1024:
@@ -328,6 +571,9 @@ class PeerServer(threading.Thread):
             conn.close()
 
 class Client:
+    # Concurrent P2P downloads per client; extra fetches wait (PENDING) for a slot
+    MAX_CONCURRENT_DOWNLOADS = 4
+    
     def __init__(self, hostname, listen_port, repo_dir, display_name=None, server_host=None, server_port=None, advertise_ip=None):
         self.hostname = hostname
         self.display_name = display_name or hostname
@@ -349,8 +595,8 @@ class Client:
         print(f"[INFO] Client will advertise IP: {self.advertise_ip} for P2P connections")
         
         # Three-tier file management
-        self.local_files = {}  # All files tracked by client (metadata only)
-        self.published_files = {}  # Files published to network (subset of local)
+        self.local_files = VersionedDict()  # All files tracked by client (metadata only)
+        self.published_files = VersionedDict()  # Files published to network (subset of local)
         self.network_files = {}  # Files available from other clients
         
         # State file to persist published status
@@ -367,6 +613,8 @@ class Client:
             self.adaptive_heartbeat = None
             print("[INFO] Using fixed heartbeat interval")
         
+        self._download_slots = threading.BoundedSemaphore(self.MAX_CONCURRENT_DOWNLOADS)
+        
         # IMPORTANT: Scan repo directory FIRST to get current files
         self._scan_repo_directory()
         
@@ -377,6 +625,8 @@ class Client:
         print(f"[INFO] Connecting to server at {self.server_host}:{self.server_port}")
         self.central_lock = threading.Lock()
         self.central = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Requests are small single-line messages: send each at once (no Nagle delay)
+        self.central.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         try:
             self.central.connect((self.server_host, self.server_port))
             print(f"[SUCCESS] Connected to server at {self.server_host}:{self.server_port}")
@@ -411,10 +661,81 @@ class Client:
             print(f"[ERROR] {error_msg}")
             raise RuntimeError(error_msg)
         
+        # From here on the central connection is multiplexed: each request
+        # carries a req_id and _central_reader routes responses back to the
+        # waiting caller, so central_lock only covers the sendall()
+        self._central_inflight = {}  # req_id -> queue.Queue for the response
+        self._central_inflight_lock = threading.Lock()
+        self._central_seq = itertools.count(1)
+        self._central_file = self.central.makefile('rb')
+        threading.Thread(target=self._central_reader, daemon=True).start()
+        
         self.pub_lock = threading.Lock()
         self.peer_server = PeerServer(self.listen_port, self)  # Pass client reference
         self.peer_server.start()
-        threading.Thread(target=self.heartbeat_thread, daemon=True).start()
+        if self.adaptive_heartbeat:
+            # Shared timer thread for every Client in the process
+            self.adaptive_heartbeat.register(self._send_heartbeat)
+        else:
+            threading.Thread(target=self.heartbeat_thread, daemon=True).start()
+    
+    def central_request(self, msg, timeout=30):
+        """
+        Send a request to the central server and wait for its response
+        
+        Concurrent callers don't queue behind each other's round trips:
+        only the write is serialized, and the response is matched back by
+        req_id in _central_reader.
+        
+        Args:
+            msg: Request dict ({"action": ..., "data": ...})
+            timeout: Seconds to wait for the response
+        
+        Returns:
+            Response dict, or None if the connection closed or timed out
+        """
+        req_id = next(self._central_seq)
+        waiter = queue.Queue(maxsize=1)
+        with self._central_inflight_lock:
+            self._central_inflight[req_id] = waiter
+        # Encode outside the lock: central_lock covers only the sendall()
+        line = json_bytes(dict(msg, req_id=req_id)) + b'\n'
+        try:
+            with self.central_lock:
+                self.central.sendall(line)
+            return waiter.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        finally:
+            with self._central_inflight_lock:
+                self._central_inflight.pop(req_id, None)
+    
+    def _central_reader(self):
+        """Read responses from the central server and hand them to waiting requests"""
+        try:
+            for line in self._central_file:
+                resp = json_loads(line)
+                req_id = resp.pop('req_id', None)
+                with self._central_inflight_lock:
+                    if req_id is None:
+                        # Server didn't echo req_id; it answers in order, so
+                        # this belongs to the oldest outstanding request
+                        req_id = next(iter(self._central_inflight), None)
+                    waiter = self._central_inflight.get(req_id)
+                if waiter:
+                    waiter.put(resp)
+        except Exception as e:
+            if self.running:
+                print(f"[CENTRAL] Connection reader failed: {e}")
+        finally:
+            # Connection is gone - wake everyone still waiting
+            with self._central_inflight_lock:
+                waiters = list(self._central_inflight.values())
+            for waiter in waiters:
+                try:
+                    waiter.put_nowait(None)
+                except queue.Full:
+                    pass
     
     def _load_state(self):
         """Load published state from local file"""
@@ -516,21 +837,45 @@ class Client:
             print(f"[ERROR] Failed to save metadata for {fname}: {e}")
             return False
     
-    def add_local_file(self, filepath, auto_save_metadata=True):
-        """Add a file to local tracking (without copying or publishing)"""
+    @property
+    def local_files_version(self):
+        """Changes whenever local/published files or any of their metadata change"""
+        return f"{self.hostname}-{self.local_files.version}.{self.published_files.version}"
+    
+    def queue_file_metadata(self, fname):
+        """Queue a metadata write for fname (written within METADATA_FLUSH_INTERVAL)"""
+        enqueue_file_metadata(self, fname)
+    
+    def flush_metadata(self):
+        """Block until all queued metadata writes have reached disk"""
+        if _metadata_writer_started:
+            _metadata_queue.join()
+    
+    def add_local_file(self, filepath, auto_save_metadata=True, stat_result=None):
+        """
+        Add a file to local tracking (without copying or publishing)
+        
+        Args:
+            filepath: Path to the file
+            auto_save_metadata: Queue a .meta.json write for the file
+            stat_result: Optional os.stat() result the caller already has
+                (e.g. DirEntry.stat() from scandir) - avoids stat'ing again
+        """
         filepath = os.path.abspath(os.path.expanduser(filepath))
-        if not os.path.isfile(filepath):
+        if stat_result is None:
+            try:
+                stat_result = os.stat(filepath)
+            except OSError:
+                stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
             print(f"[ERROR] File not found: {filepath}")
             return False
         
         fname = os.path.basename(filepath)
+        invalidate_stat(filepath)
         
-        # Get cross-platform metadata
-        try:
-            meta_dict = get_file_metadata_crossplatform(filepath)
-        except Exception as e:
-            print(f"[ERROR] Failed to read metadata: {e}")
-            return False
+        # Cross-platform metadata from the stat we already have
+        meta_dict = metadata_from_stat(stat_result, filepath)
         
         self.local_files[fname] = FileMetadata(
             name=fname,
@@ -542,41 +887,43 @@ class Client:
             added_at=time.time()  # Track when added to local files
         )
         
-        # Save metadata to JSON
+        # Save metadata to JSON (write-behind, see _metadata_writer)
         if auto_save_metadata:
-            self._save_file_metadata(fname)
+            self.queue_file_metadata(fname)
         
         print(f"[INFO] Added '{fname}' to local tracking")
         return True
     
+    def _send_heartbeat(self):
+        """
+        Send one adaptive heartbeat (called by the shared HeartbeatScheduler)
+        
+        Returns:
+            False to stop further heartbeats (client closed or send failed)
+        """
+        if not self.running:
+            return False
+        try:
+            self.central_request({"action": "PING", "data": {
+                "hostname": self.hostname,
+                "state": self.adaptive_heartbeat.state.value
+            }})
+            return True
+        except Exception as e:
+            if self.running:  # Only log if we're supposed to be running
+                print(f"[HEARTBEAT] Failed: {e}")
+            return False
+    
     def heartbeat_thread(self):
-        """Send periodic heartbeat to central server with adaptive intervals"""
+        """Send periodic heartbeat to central server at the fixed interval"""
         while self.running:
             try:
-                # Get interval (adaptive or fixed)
-                if self.adaptive_heartbeat:
-                    interval = self.adaptive_heartbeat.get_interval()
-                else:
-                    interval = CLIENT_HEARTBEAT_INTERVAL
-                
-                time.sleep(interval)
+                time.sleep(CLIENT_HEARTBEAT_INTERVAL)
                 
                 if not self.running:
                     break
                 
-                with self.central_lock:
-                    ping_data = {"hostname": self.hostname}
-                    
-                    # Include state if using adaptive heartbeat
-                    if self.adaptive_heartbeat:
-                        ping_data["state"] = self.adaptive_heartbeat.state.value
-                    
-                    send_json(self.central, {"action": "PING", "data": ping_data})
-                    recv_json(self.central)
-                    
-                    # Record heartbeat
-                    if self.adaptive_heartbeat:
-                        self.adaptive_heartbeat.record_heartbeat()
+                self.central_request({"action": "PING", "data": {"hostname": self.hostname}})
                         
             except Exception as e:
                 if self.running:  # Only log if we're supposed to be running
@@ -624,6 +971,7 @@ class Client:
             # Normalize path (expand ~ and make absolute)
             local_path = os.path.expanduser(local_path)
             local_path = os.path.abspath(local_path)
+            invalidate_stat(local_path)
 
             # Check if file exists and is valid
             if not os.path.exists(local_path):
@@ -718,19 +1066,17 @@ class Client:
             self._save_file_metadata(fname)
 
             # Notify central server with metadata
-            with self.central_lock:
-                send_json(self.central, {
-                    "action": "PUBLISH",
-                    "data": {
-                        "hostname": self.hostname, 
-                        "fname": fname,
-                        "size": file_size,
-                        "modified": file_modified,
-                        "created": file_created,
-                        "published_at": metadata.published_at
-                    }
-                })
-                r = recv_json(self.central)
+            r = self.central_request({
+                "action": "PUBLISH",
+                "data": {
+                    "hostname": self.hostname, 
+                    "fname": fname,
+                    "size": file_size,
+                    "modified": file_modified,
+                    "created": file_created,
+                    "published_at": metadata.published_at
+                }
+            })
 
             if r and r.get('status') == 'ACK':
                 print(f"[SUCCESS] Published '{fname}' to network (reference to: {local_path})")
@@ -761,9 +1107,7 @@ class Client:
             }
         """
         try:
-            with self.central_lock:
-                send_json(self.central, {"action": "LIST"})
-                response = recv_json(self.central)
+            response = self.central_request({"action": "LIST"})
             
             if not response or response.get('status') != 'OK':
                 return {
@@ -837,21 +1181,20 @@ class Client:
             
             # Update local file metadata
             if fname in self.local_files:
+                invalidate_stat(self.local_files[fname].path)
                 self.local_files[fname].is_published = False
                 self.local_files[fname].published_at = None
                 # Save updated metadata
                 self._save_file_metadata(fname)
             
             # Notify central server
-            with self.central_lock:
-                send_json(self.central, {
-                    "action": "UNPUBLISH",
-                    "data": {
-                        "hostname": self.hostname,
-                        "fname": fname
-                    }
-                })
-                r = recv_json(self.central)
+            r = self.central_request({
+                "action": "UNPUBLISH",
+                "data": {
+                    "hostname": self.hostname,
+                    "fname": fname
+                }
+            })
             
             if r and r.get('status') == 'ACK':
                 print(f"[SUCCESS] Unpublished '{fname}' from network")
@@ -885,9 +1228,7 @@ class Client:
             print(f"   Local file - Size: {local_meta.size} bytes, Modified: {datetime.fromtimestamp(local_meta.modified).strftime('%Y-%m-%d %H:%M:%S')}")
             
             # Try to get info about the file to download
-            with self.central_lock:
-                send_json(self.central, {"action":"REQUEST","data":{"fname":fname}})
-                r = recv_json(self.central)
+            r = self.central_request({"action":"REQUEST","data":{"fname":fname}})
             
             if r and r.get('status') == 'FOUND':
                 hosts = r.get('hosts', [])
@@ -915,9 +1256,7 @@ class Client:
                         # Non-interactive mode, continue anyway
                         print("[INFO] Non-interactive mode, continuing download...")
         
-        with self.central_lock:
-            send_json(self.central, {"action":"REQUEST","data":{"fname":fname}})
-            r = recv_json(self.central)
+        r = self.central_request({"action":"REQUEST","data":{"fname":fname}})
         
         if not r:
             print("No response from server")
@@ -939,6 +1278,7 @@ class Client:
         """
         Download a file from a peer with chunked streaming and progress tracking
         This is a direct P2P transfer - no server intervention for file bits
+        At most MAX_CONCURRENT_DOWNLOADS run at once per client
         
         Args:
             ip: Peer IP address
@@ -951,6 +1291,11 @@ class Client:
         Returns:
             Path to downloaded file or None on failure
         """
+        with self._download_slots:
+            return self._download_from_peer(ip, port, fname, save_path, progress_callback, fetch_id)
+    
+    def _download_from_peer(self, ip, port, fname, save_path=None, progress_callback=None, fetch_id=None):
+        """Body of download_from_peer (called while holding a download slot)"""
         # Mark as busy for large file transfers
         if self.adaptive_heartbeat:
             self.adaptive_heartbeat.start_file_transfer()
@@ -1006,6 +1351,7 @@ class Client:
             
             # Use fetch session for large files (> 10MB) or if fetch_id provided
             fetch_session = None
+            final_st = None
             if use_fetch_manager and (total_size > 10*1024*1024 or fetch_id):
                 if fetch_id:
                     # Use existing session from fetch_manager
@@ -1037,18 +1383,11 @@ class Client:
                     )
                     fetch_session.start()
                 
-                # Download in chunks (direct P2P transfer)
-                data = rest
-                chunk_size = 256*1024  # 256KB network chunks
+                # Download in batches (direct P2P transfer)
+                last_report = [-5]
                 
-                while len(data) < total_size:
-                    chunk = s.recv(min(chunk_size, total_size - len(data)))
-                    if not chunk:
-                        break
-                    
-                    # Write chunk
-                    fetch_session.write_chunk(chunk)
-                    data += chunk
+                def write_batch(block):
+                    fetch_session.write_chunk(block)
                     
                     # Report progress
                     if progress_callback:
@@ -1060,13 +1399,17 @@ class Client:
                         )
                     
                     # Progress display (every 5%)
-                    percent = (len(data) / total_size) * 100
-                    if int(percent) % 5 == 0 and len(data) > 0:
+                    percent = (fetch_session.progress.downloaded_size / total_size) * 100
+                    if int(percent) >= last_report[0] + 5:
+                        last_report[0] = int(percent)
                         speed_mbps = fetch_session.progress.speed_bps / (1024*1024)
                         print(f"[FETCH] Progress: {percent:.1f}% - {speed_mbps:.2f} MB/s")
                 
+                recv_into_batches(s, rest, total_size, write_batch)
+                
                 # Complete download - verify size only (P2P, no hashing)
                 if fetch_session.complete():
+                    final_st = fetch_session.final_stat
                     print(f"[SUCCESS] P2P fetch complete: {fname}")
                     print(f"[VERIFY] Size verified: {total_size:,} bytes")
                 else:
@@ -1079,23 +1422,16 @@ class Client:
             if not fetch_session:
                 # Legacy method for small files
                 print(f"[FETCH] Using legacy method for small file")
-                data = rest
-                chunk_size = 256*1024
-                bytes_received = len(data)
-                
                 with open(outpath, 'wb') as f:
-                    if data:
-                        f.write(data)
-                    
-                    while bytes_received < total_size:
-                        chunk = s.recv(min(chunk_size, total_size - bytes_received))
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        bytes_received += len(chunk)
-                        
-                        if progress_callback:
-                            progress_callback(bytes_received, total_size, 0)
+                    if progress_callback:
+                        def write_batch(block):
+                            f.write(block)
+                            progress_callback(f.tell(), total_size, 0)
+                    else:
+                        write_batch = f.write
+                    bytes_received = recv_into_batches(s, rest, total_size, write_batch)
+                    f.flush()
+                    final_st = os.fstat(f.fileno())
                 
                 if bytes_received != total_size:
                     print(f"[ERROR] Size mismatch: expected {total_size}, got {bytes_received}")
@@ -1105,17 +1441,22 @@ class Client:
                     return None
             
             s.close()
+            invalidate_stat(outpath)
             
-            # Get file metadata with cross-platform support
+            # Get file metadata with cross-platform support, from the fstat
+            # taken before the file was closed when there is one
             try:
-                meta_dict = get_file_metadata_crossplatform(outpath)
+                if final_st is not None:
+                    meta_dict = metadata_from_stat(final_st, outpath)
+                else:
+                    meta_dict = get_file_metadata_crossplatform(outpath)
             except Exception as e:
                 print(f"[WARN] Failed to read metadata, using fallback: {e}")
-                stat = os.stat(outpath)
+                st = os.stat(outpath)
                 meta_dict = {
-                    'size': stat.st_size,
-                    'modified': stat.st_mtime,
-                    'created': stat.st_mtime,
+                    'size': st.st_size,
+                    'modified': st.st_mtime,
+                    'created': st.st_mtime,
                     'path': outpath
                 }
             
@@ -1152,15 +1493,11 @@ class Client:
             return None
 
     def discover(self, hostname):
-        with self.central_lock:
-            send_json(self.central, {"action":"DISCOVER","data":{"hostname":hostname}})
-            r = recv_json(self.central)
+        r = self.central_request({"action":"DISCOVER","data":{"hostname":hostname}})
         print(r)
 
     def ping(self, hostname):
-        with self.central_lock:
-            send_json(self.central, {"action":"PING","data":{"hostname":hostname}})
-            r = recv_json(self.central)
+        r = self.central_request({"action":"PING","data":{"hostname":hostname}})
         print(r)
 
     def list_local(self):
@@ -1182,9 +1519,7 @@ class Client:
     
     def list_network(self):
         """Fetch and display all files available on the network"""
-        with self.central_lock:
-            send_json(self.central, {"action":"LIST"})
-            r = recv_json(self.central)
+        r = self.central_request({"action":"LIST"})
         
         print("\n=== NETWORK FILES (Available from all clients) ===")
         if r and r.get('status') == 'OK':
@@ -1207,17 +1542,13 @@ class Client:
             print("  (Failed to retrieve network files)")
 
     def list_registry(self):
-        with self.central_lock:
-            send_json(self.central, {"action":"LIST"})
-            r = recv_json(self.central)
+        r = self.central_request({"action":"LIST"})
         print(json.dumps(r, indent=2))
 
     def unregister(self):
         """Unregister from server and close connection"""
         try:
-            with self.central_lock:
-                send_json(self.central, {"action":"UNREGISTER","data":{"hostname":self.hostname}})
-                recv_json(self.central)
+            self.central_request({"action":"UNREGISTER","data":{"hostname":self.hostname}})
         except:
             pass  # Ignore errors if connection already closed
     
@@ -1225,6 +1556,14 @@ class Client:
         """Close client and cleanup resources"""
         print(f"[CLIENT] Closing client '{self.hostname}'...")
         self.running = False  # Stop heartbeat thread and peer server
+        if self.adaptive_heartbeat:
+            self.adaptive_heartbeat.unregister()
+        
+        # Make sure queued metadata writes are on disk before shutting down
+        try:
+            self.flush_metadata()
+        except Exception as e:
+            print(f"[CLIENT] Error flushing metadata: {e}")
         
         # Stop peer server first (will exit its loop when running=False)
         try:
@@ -1241,8 +1580,13 @@ class Client:
         except Exception as e:
             print(f"[CLIENT] Error unregistering: {e}")
         
-        # Close central server connection
+        # Close central server connection (shutdown wakes _central_reader)
+        try:
+            self.central.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
         try:
+            self._central_file.close()
             self.central.close()
             print("[CLIENT] Central server connection closed")
         except Exception as e:
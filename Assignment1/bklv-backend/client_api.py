@@ -7,31 +7,171 @@ Note: User authentication is FORWARDED to central server.
 Client API does NOT manage users locally - all user data is centralized on server.
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import socket
 import threading
+import atexit
+import errno
+import io
 import json
+import logging
 import os
+import shutil
+import stat
 import sys
+import tempfile
 from datetime import datetime
 import time
+import unicodedata
+import urllib.parse
 import jwt
 import uuid
 import requests
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Import the Client class and config
-from client import Client, send_json, recv_json, CENTRAL_HOST, CENTRAL_PORT
-from config import CLIENT_API_HOST, CLIENT_API_PORT, JWT_SECRET_KEY, SESSION_TIMEOUT
+from client import Client, FileMetadata, json_bytes, metadata_from_stat, stat_cached, invalidate_stat, CENTRAL_HOST, CENTRAL_PORT
+from config import CLIENT_API_HOST, CLIENT_API_PORT, CLIENT_API_MAX_UPLOAD, CLIENT_API_EVENT_STREAMS, JWT_SECRET_KEY, SESSION_TIMEOUT, ensure_dirs
 from user_db import find_available_port  # Only need port management
 from optimizations.fetch_manager import fetch_manager
+from optimizations.json_provider import install_json_provider
 
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='[%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+ensure_dirs()
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = CLIENT_API_MAX_UPLOAD or None  # Larger uploads get 413
 CORS(app)
+install_json_provider(app)  # orjson for request.json / jsonify when installed
+
+# Reusable JWT decoder: options and key are prepared once instead of per request
+_pyjwt = jwt.PyJWT(options={'require': ['exp']})
+_jwt_key = JWT_SECRET_KEY.encode() if isinstance(JWT_SECRET_KEY, str) else JWT_SECRET_KEY
+
+# Verified token -> payload, so repeated requests with the same token skip HMAC + JSON parse.
+# Logged-out tokens go to _revoked_tokens (token -> exp) until they would expire anyway.
+TOKEN_CACHE_SIZE = 8192
+BAD_TOKEN_CACHE_SIZE = 1024
+_token_cache = OrderedDict()
+_bad_tokens = OrderedDict()  # token -> (exception class, message) for _PERMANENT_TOKEN_ERRORS
+# Errors a token can never recover from (InvalidSignatureError is a DecodeError).
+# ImmatureSignatureError (nbf/iat in the future) is not cached: it turns valid later.
+_PERMANENT_TOKEN_ERRORS = (jwt.DecodeError, jwt.ExpiredSignatureError)
+_revoked_tokens = {}
+_token_lock = threading.Lock()
+
+def decode_token(token):
+    """
+    Verify a JWT (HS256) and return its payload, using the verified-token cache
+    
+    Raises:
+        jwt.ExpiredSignatureError, jwt.InvalidTokenError
+    """
+    payload = _token_cache.get(token)
+    if payload is None:
+        bad = _bad_tokens.get(token)
+        if bad is not None:
+            raise bad[0](bad[1])
+        try:
+            payload = _pyjwt.decode(token, _jwt_key, algorithms=['HS256'])
+        except _PERMANENT_TOKEN_ERRORS as e:
+            with _token_lock:
+                _bad_tokens[token] = (type(e), str(e))
+                if len(_bad_tokens) > BAD_TOKEN_CACHE_SIZE:
+                    _bad_tokens.popitem(last=False)
+            raise
+        with _token_lock:
+            _token_cache[token] = payload
+            if len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    
+    if payload['exp'] < time.time():
+        with _token_lock:
+            _token_cache.pop(token, None)
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    if token in _revoked_tokens:
+        raise jwt.InvalidTokenError("Token has been revoked (logged out)")
+    return payload
+
+def revoke_token(token, exp):
+    """Evict a token from the cache and reject it until it expires (logout)"""
+    now = time.time()
+    with _token_lock:
+        _token_cache.pop(token, None)
+        for revoked, revoked_exp in list(_revoked_tokens.items()):
+            if revoked_exp < now:
+                del _revoked_tokens[revoked]
+        _revoked_tokens[token] = exp
+
+# Worker pools for background jobs (bounded, threads are reused). Publishes and
+# fetches get separate pools: fetches can sit waiting for a download slot or a
+# slow peer and must not hold up quick publishes queued behind them.
+PUBLISH_POOL_SIZE = 8
+FETCH_POOL_SIZE = 16
+PUBLISH_POOL = ThreadPoolExecutor(max_workers=PUBLISH_POOL_SIZE, thread_name_prefix='publish')
+FETCH_POOL = ThreadPoolExecutor(max_workers=FETCH_POOL_SIZE, thread_name_prefix='fetch')
+atexit.register(PUBLISH_POOL.shutdown, cancel_futures=True)
+atexit.register(FETCH_POOL.shutdown, cancel_futures=True)
+FETCH_RETRY_POLL = 0.25  # Seconds between ready_for_retry checks during a backoff
 
-# Session-based client instances - stores multiple clients by username
+# Background publish jobs: (hostname, fname) -> Future, for /publish-status
+_publish_jobs = {}
+_publish_jobs_lock = threading.Lock()
+
+# Session-based client instances - stores multiple clients by username.
+# Copy-on-write: the dict bound to client_instances is never mutated, writers
+# publish a new one, so readers (get_client, health, debug) take no lock and
+# can iterate it directly. init/logout for the same user are serialized by
+# that user's lock.
 client_instances = {}
-clients_lock = threading.Lock()
+client_instances_version = 0  # Bumped whenever a new dict is published
+_client_instances_write_lock = threading.Lock()
+per_user_locks = defaultdict(threading.Lock)
+
+def register_client_instance(username, client):
+    """Publish client as username's instance (replacing any previous one)"""
+    global client_instances, client_instances_version
+    with _client_instances_write_lock:
+        updated = dict(client_instances)
+        updated[username] = client
+        client_instances = updated
+        client_instances_version += 1
+
+def remove_client_instance(username):
+    """Drop username's instance; returns it (or None)"""
+    global client_instances, client_instances_version
+    with _client_instances_write_lock:
+        updated = dict(client_instances)
+        client = updated.pop(username, None)
+        client_instances = updated
+        client_instances_version += 1
+    return client
+
+def versioned_json(etag, build_payload):
+    """
+    Respond with 304 if the browser already has this version (If-None-Match),
+    otherwise build and jsonify the payload tagged with a weak ETag
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        payload = build_payload()
+        if isinstance(payload, bytes):  # Already serialized
+            response = app.response_class(payload, mimetype='application/json')
+        else:
+            response = jsonify(payload)
+    response.set_etag(etag, weak=True)
+    return response
+
+def conditional_json(payload):
+    """jsonify payload with a content-hash ETag; 304 if unchanged for the browser"""
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
 
 def get_client(username=None):
     """Get the client instance for a specific user"""
@@ -41,29 +181,36 @@ def get_client(username=None):
         if auth_header and auth_header.startswith('Bearer '):
             token = auth_header.split(' ')[1]
             try:
-                payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
+                payload = decode_token(token)
                 username = payload.get('username')
-                print(f"[DEBUG] Extracted username '{username}' from token")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Extracted username '%s' from token", username)
             except jwt.ExpiredSignatureError:
-                print("[ERROR] Token has expired")
+                logger.error("Token has expired")
                 raise Exception("Token has expired. Please login again.")
             except jwt.InvalidTokenError as e:
-                print(f"[ERROR] Invalid token: {e}")
+                logger.error("Invalid token: %s", e)
                 raise Exception("Invalid token. Please login again.")
             except Exception as e:
-                print(f"[ERROR] Token decode error: {e}")
+                logger.error("Token decode error: %s", e)
                 raise Exception("Invalid or expired token")
         
         if username is None:
-            print("[ERROR] No username in token or Authorization header missing")
+            logger.error("No username in token or Authorization header missing")
             raise Exception("Username not provided and token not found")
     
-    with clients_lock:
-        if username not in client_instances:
-            print(f"[ERROR] No client instance for user '{username}'. Available: {list(client_instances.keys())}")
-            raise Exception(f"Client not initialized for user '{username}'. Call /api/client/init first.")
-        print(f"[DEBUG] Found client instance for user '{username}'")
-        return client_instances[username]
+    client = client_instances.get(username)
+    if client is None:
+        if logger.isEnabledFor(logging.ERROR):
+            logger.error("No client instance for user '%s'. Available: %s", username, list(client_instances))
+        raise Exception(f"Client not initialized for user '{username}'. Call /api/client/init first.")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Found client instance for user '%s'", username)
+    return client
+
+# Keep-alive HTTP connections to the Server API (register/login/token verify),
+# so each init/login doesn't pay a new TCP handshake
+server_api_session = requests.Session()
 
 @app.route('/api/client/register', methods=['POST'])
 def register_user():
@@ -84,9 +231,9 @@ def register_user():
     try:
         # Forward to server API
         server_url = f'http://{server_host}:{server_port}/api/user/register'
-        print(f"[AUTH] Forwarding registration to server: {server_url}")
+        logger.debug("[AUTH] Forwarding registration to server: %s", server_url)
         
-        response = requests.post(server_url, json={
+        response = server_api_session.post(server_url, json={
             'username': username,
             'password': password,
             'display_name': display_name
@@ -94,7 +241,7 @@ def register_user():
         
         return jsonify(response.json()), response.status_code
     except Exception as e:
-        print(f"[ERROR] Failed to forward registration: {e}")
+        logger.error("Failed to forward registration: %s", e)
         return jsonify({
             'success': False,
             'error': f'Failed to connect to server: {str(e)}'
@@ -118,16 +265,16 @@ def login_user():
     try:
         # Forward to server API
         server_url = f'http://{server_host}:{server_port}/api/user/login'
-        print(f"[AUTH] Forwarding login to server: {server_url}")
+        logger.debug("[AUTH] Forwarding login to server: %s", server_url)
         
-        response = requests.post(server_url, json={
+        response = server_api_session.post(server_url, json={
             'username': username,
             'password': password
         }, timeout=10)
         
         return jsonify(response.json()), response.status_code
     except Exception as e:
-        print(f"[ERROR] Failed to forward login: {e}")
+        logger.error("Failed to forward login: %s", e)
         return jsonify({
             'success': False,
             'error': f'Failed to connect to server: {str(e)}'
@@ -145,70 +292,71 @@ def init_client():
     server_port = data.get('server_port', 9000)
     advertise_ip = data.get('advertise_ip')  # Optional: client can specify IP to advertise
     
-    print(f"[INIT] Received init request for username: '{username}'")
-    print(f"[INIT] Server IP: {server_ip}, Advertise IP: {advertise_ip}")
+    logger.debug("[INIT] Received init request for username: '%s'", username)
+    logger.debug("[INIT] Server IP: %s, Advertise IP: %s", server_ip, advertise_ip)
     
     if not username:
-        print("[INIT] ERROR: No username provided")
+        logger.error("[INIT] No username provided")
         return jsonify({'success': False, 'error': 'Username required'}), 400
     
     # Verify user with server (via token)
     auth_header = request.headers.get('Authorization')
     if not auth_header:
-        print("[INIT] ERROR: No authorization token")
+        logger.error("[INIT] No authorization token")
         return jsonify({'success': False, 'error': 'Authentication required'}), 401
     
     try:
         # Verify token with server
         server_api_port = 5500  # Server API port
         verify_url = f'http://{server_ip}:{server_api_port}/api/user/verify'
-        print(f"[INIT] Verifying token with server: {verify_url}")
+        logger.debug("[INIT] Verifying token with server: %s", verify_url)
         
-        verify_response = requests.post(verify_url, headers={
+        verify_response = server_api_session.post(verify_url, headers={
             'Authorization': auth_header
         }, timeout=10)
         
         if not verify_response.ok:
-            print(f"[INIT] ERROR: Token verification failed")
+            logger.error("[INIT] Token verification failed")
             return jsonify({'success': False, 'error': 'Invalid or expired token'}), 401
         
         user_data = verify_response.json()
         user = user_data.get('user', {})
         display_name = user.get('display_name', username)
         
-        print(f"[INIT] User verified: {username} ({display_name})")
+        logger.info("[INIT] User verified: %s (%s)", username, display_name)
     except Exception as e:
-        print(f"[INIT] ERROR: Failed to verify with server: {e}")
+        logger.error("[INIT] Failed to verify with server: %s", e)
         return jsonify({'success': False, 'error': f'Server verification failed: {str(e)}'}), 500
     
     try:
         # Auto-assign port if needed
         port = find_available_port()
         if not port:
-            print("[INIT] ERROR: No available ports")
+            logger.error("[INIT] No available ports")
             return jsonify({'success': False, 'error': 'No available ports'}), 500
         
         # Use username as hostname for consistency
         hostname = username
         repo = f'repo_{username}'
         
-        print(f"[INIT] Creating client: hostname={hostname}, port={port}, repo={repo}, server={server_ip}:{server_port}")
+        logger.info("[INIT] Creating client: hostname=%s, port=%s, repo=%s, server=%s:%s", hostname, port, repo, server_ip, server_port)
         if advertise_ip:
-            print(f"[INIT] Using advertised IP: {advertise_ip}")
+            logger.debug("[INIT] Using advertised IP: %s", advertise_ip)
         
-        with clients_lock:
+        with per_user_locks[username]:
             # Close existing client for this user if it exists
-            if username in client_instances:
+            previous = client_instances.get(username)
+            if previous is not None:
                 try:
-                    client_instances[username].close()
-                    print(f"[INIT] Closed previous client instance for '{username}'")
+                    previous.close()
+                    logger.info("[INIT] Closed previous client instance for '%s'", username)
                 except Exception as e:
-                    print(f"[INIT] WARN: Error closing previous client for '{username}': {e}")
+                    logger.warning("[INIT] Error closing previous client for '%s': %s", username, e)
             
             # Create new client instance for this user
             try:
                 # Pass server_ip, server_port, and advertise_ip to Client constructor
-                client_instances[username] = Client(
+                client = Client(
                     hostname, 
                     port, 
                     repo, 
@@ -217,18 +365,17 @@ def init_client():
                     server_port=server_port,
                     advertise_ip=advertise_ip  # Pass advertise_ip
                 )
+                register_client_instance(username, client)
                 
                 # Get the actual IP being advertised
-                actual_ip = client_instances[username].advertise_ip
+                actual_ip = client.advertise_ip
                 
-                print(f"[INIT] SUCCESS: Created client instance for '{username}' on port {port}")
-                print(f"[INIT] Connected to server at {server_ip}:{server_port}")
-                print(f"[INIT] Advertising IP: {actual_ip} for P2P connections")
-                print(f"[INIT] Active clients: {list(client_instances.keys())}")
+                logger.info("[INIT] Created client instance for '%s' on port %s", username, port)
+                logger.info("[INIT] Connected to server at %s:%s", server_ip, server_port)
+                logger.info("[INIT] Advertising IP: %s for P2P connections", actual_ip)
+                logger.debug("[INIT] Active clients: %s", list(client_instances.keys()))
             except Exception as client_error:
-                print(f"[INIT] ERROR: Failed to create Client instance: {client_error}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("[INIT] Failed to create Client instance: %s", client_error)
                 raise
         
         return jsonify({
@@ -245,7 +392,7 @@ def init_client():
             }
         })
     except Exception as e:
-        print(f"[ERROR] Failed to initialize client for '{username}': {e}")
+        logger.error("Failed to initialize client for '%s': %s", username, e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/client/status', methods=['GET'])
@@ -265,24 +412,68 @@ def get_client_status():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+FILE_COLUMNS = ('name', 'size', 'modified', 'created', 'is_published', 'added_at', 'published_at')
+FILE_DETAIL_COLUMNS = FILE_COLUMNS + ('path',)
+
+def _files_detail():
+    """True when the caller asked for ?detail=1 (include absolute file paths)"""
+    return request.args.get('detail') == '1'
+
+def _files_layout():
+    """Layout/detail part of the file list ETag: 'columns-', 'detail-', both or ''"""
+    layout = 'columns-' if request.args.get('layout') == 'columns' else ''
+    return layout + 'detail-' if _files_detail() else layout
+
+def _files_payload(metas):
+    """
+    Payload for the file list endpoints.
+    Default: JSON bytes, 'files' is a list of objects (one per file) joined from
+    each FileMetadata's cached row - unchanged files are never re-encoded.
+    ?layout=columns: 'files' is a dict of parallel lists (one per field) - much
+    smaller and cheaper to encode for large repositories.
+    Absolute paths are only included with ?detail=1.
+    """
+    detail = _files_detail()
+    if request.args.get('layout') != 'columns':
+        return b'{"success":true,"files":[' + b','.join([meta.to_json_bytes(detail) for meta in metas]) + b']}'
+    
+    views = [meta.as_dict for meta in metas]
+    fields = FILE_DETAIL_COLUMNS if detail else FILE_COLUMNS
+    columns = {field: [view[field] for view in views] for field in fields}
+    return json_bytes({'success': True, 'layout': 'columns', 'count': len(views), 'files': columns})
+
+# Last encoded list body per (hostname, list, layout): polls without a matching
+# If-None-Match (new tab, other browser) get the bytes as-is until the list changes
+_files_body_cache = {}  # (hostname, kind, layout) -> (local_files_version, body)
+
+def files_body(client, kind):
+    """
+    Encoded local-files ('local') or published-files ('published') body for
+    this request's layout, rebuilt only after the client's files change
+    """
+    key = (client.hostname, kind, _files_layout())
+    version = client.local_files_version  # Read first: a concurrent change just forces a rebuild next time
+    entry = _files_body_cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    files = client.local_files if kind == 'local' else client.published_files
+    body = _files_payload(files.values())
+    _files_body_cache[key] = (version, body)
+    return body
+
+def _drop_files_bodies(hostname):
+    for key in [k for k in _files_body_cache if k[0] == hostname]:
+        _files_body_cache.pop(key, None)
+
 @app.route('/api/client/local-files', methods=['GET'])
 def get_local_files():
     """Get list of local tracked files"""
     try:
         client = get_client()  # Will extract username from token
-        files = []
-        for fname, meta in client.local_files.items():
-            files.append({
-                'name': meta.name,
-                'size': meta.size,
-                'modified': meta.modified,
-                'created': meta.created,
-                'path': meta.path,
-                'is_published': meta.is_published,
-                'added_at': meta.added_at,
-                'published_at': meta.published_at
-            })
-        return jsonify({'success': True, 'files': files})
+        return versioned_json(
+            'local-' + _files_layout() + client.local_files_version,
+            lambda: files_body(client, 'local')
+        )
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -291,54 +482,193 @@ def get_published_files():
     """Get list of published files"""
     try:
         client = get_client()  # Will extract username from token
-        files = []
-        for fname, meta in client.published_files.items():
-            files.append({
-                'name': meta.name,
-                'size': meta.size,
-                'modified': meta.modified,
-                'created': meta.created,
-                'path': meta.path,
-                'added_at': meta.added_at,
-                'published_at': meta.published_at
-            })
-        return jsonify({'success': True, 'files': files})
+        return versioned_json(
+            'published-' + _files_layout() + client.local_files_version,
+            lambda: files_body(client, 'published')
+        )
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# LIST_FLAT responses memoized per central server for NETWORK_MEMO_TTL: all users and
+# tabs polling network-files within that window share one round trip (one in flight).
+NETWORK_MEMO_TTL = 1.0
+# Interactive routes give up on the central server after this long (instead of
+# Client.central_request's 30s default) so a stalled tracker can't pin API workers
+CENTRAL_UI_TIMEOUT = 5.0
+_network_memo = {}  # (action, server_host, server_port) -> (fetched_at, response)
+_network_memo_locks = {}
+_network_memo_guard = threading.Lock()
+
+def central_memoized(client, action, fresh=False, transform=None):
+    """
+    Read-only central request shared by all sessions on the same central server
+    for NETWORK_MEMO_TTL seconds (single-flight: one RPC per refresh)
+    
+    Args:
+        client: Client whose central connection is used on a miss
+        action: Central action without data (LIST_FLAT, LIST)
+        fresh: Ignore a memoized response older than this call
+        transform: Optional function applied once to an OK response before it is memoized
+    
+    Returns:
+        (transformed) response dict, or None/error response from the server
+    """
+    key = (action, client.server_host, client.server_port)
+    requested_at = time.monotonic()
+    entry = _network_memo.get(key)
+    if entry is not None and not fresh and entry[0] + NETWORK_MEMO_TTL > requested_at:
+        return entry[1]
+    
+    with _network_memo_guard:
+        lock = _network_memo_locks.setdefault(key, threading.Lock())
+    with lock:
+        # Another request may have refreshed it while we waited
+        entry = _network_memo.get(key)
+        if entry is not None:
+            if fresh and entry[0] >= requested_at:
+                return entry[1]
+            if not fresh and entry[0] + NETWORK_MEMO_TTL > time.monotonic():
+                return entry[1]
+        fetched_at = time.monotonic()
+        response = client.central_request({"action": action}, timeout=CENTRAL_UI_TIMEOUT)
+        if response and response.get('status') == 'OK':
+            if transform is not None:
+                response = transform(response)
+            _network_memo[key] = (fetched_at, response)
+        return response
+
+def list_flat_memoized(client, fresh=False):
+    """LIST_FLAT response for client's central server (memoized, single-flight)"""
+    return central_memoized(client, "LIST_FLAT", fresh)
+
+def _network_files_body(response):
+    """
+    Encoded {'success': True, 'files': ...} body for a memoized LIST_FLAT response.
+    Built once per response and shared by every session/SSE stream using it.
+    """
+    body = response.get('_body')
+    if body is None:
+        body = json_bytes({'success': True, 'files': response['files']})
+        response['_body'] = body  # Racing builders produce identical bytes
+    return body
+
+def _flatten_registry(response):
+    """LIST response -> LIST_FLAT-shaped response (for older central servers)"""
+    files = []
+    for hostname, info in response.get('registry', {}).items():
+        for fname, finfo in info.get('files', {}).items():
+            files.append({
+                'name': fname,
+                'size': finfo.get('size', 0),
+                'modified': finfo.get('modified', 0),
+                'created': finfo.get('created', finfo.get('modified', 0)),
+                'published_at': finfo.get('published_at', 0),
+                'owner_hostname': hostname,
+                'owner_name': info.get('display_name', hostname),
+                'owner_ip': info['addr'][0],
+                'owner_port': info['addr'][1]
+            })
+    return {'status': 'OK', 'files': files}
+
 @app.route('/api/client/network-files', methods=['GET'])
 def get_network_files():
-    """Get all files available on the network"""
+    """Get all files available on the network (?fresh=1 skips the short memo)"""
     try:
         client = get_client()  # Will extract username from token
-        with client.central_lock:
-            send_json(client.central, {"action": "LIST"})
-            response = recv_json(client.central)
+        fresh = request.args.get('fresh') == '1'
         
+        # Server-side flattened + cached list; the version doubles as ETag
+        response = list_flat_memoized(client, fresh)
         if response and response.get('status') == 'OK':
-            registry = response.get('registry', {})
-            files = []
-            
-            for hostname, info in registry.items():
-                for fname, finfo in info.get('files', {}).items():
-                    files.append({
-                        'name': fname,
-                        'size': finfo.get('size', 0),
-                        'modified': finfo.get('modified', 0),
-                        'created': finfo.get('created', finfo.get('modified', 0)),
-                        'published_at': finfo.get('published_at', 0),
-                        'owner_hostname': hostname,
-                        'owner_name': info.get('display_name', hostname),
-                        'owner_ip': info['addr'][0],
-                        'owner_port': info['addr'][1]
-                    })
-            
-            return jsonify({'success': True, 'files': files})
+            return versioned_json(
+                f"network-{client.server_host}:{client.server_port}-{response['version']}",
+                lambda: _network_files_body(response)
+            )
+        
+        # Older central server without LIST_FLAT: flatten the LIST registry here
+        response = central_memoized(client, "LIST", fresh, transform=_flatten_registry)
+        
+        if response and response.get('status') == 'OK':
+            return conditional_json({'success': True, 'files': response['files']})
         else:
             return jsonify({'success': False, 'error': 'Failed to get network files'}), 500
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+EVENTS_POLL_INTERVAL = 1.0
+EVENTS_KEEPALIVE = 15.0
+# A stream ends after this long and EventSource reconnects (after EVENTS_RETRY_MS),
+# so a tab that went away without closing its socket frees its slot eventually
+EVENTS_MAX_LIFETIME = 300.0
+EVENTS_RETRY_MS = 1000
+_event_streams = threading.BoundedSemaphore(CLIENT_API_EVENT_STREAMS)
+
+@app.route('/api/client/events', methods=['GET'])
+def client_events():
+    """
+    Server-sent events stream replacing list polling.
+    Sends 'local-files', 'published-files' and 'network-files' events (same payloads
+    as the GET endpoints) once on connect and again only when that list changes.
+    EventSource cannot set headers, so the token may be passed as ?token=...
+    
+    Every open stream occupies a request thread, so at most
+    CLIENT_API_EVENT_STREAMS run at once (503 beyond that) and each one lasts
+    at most EVENTS_MAX_LIFETIME before the browser reconnects.
+    """
+    try:
+        token = request.args.get('token')
+        username = decode_token(token).get('username') if token else None
+        client = get_client(username)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 401
+    
+    if not _event_streams.acquire(blocking=False):
+        response = jsonify({'success': False, 'error': 'Too many open event streams'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    
+    def event(name, payload):
+        data = payload.decode() if isinstance(payload, bytes) else app.json.dumps(payload)
+        return f"event: {name}\ndata: {data}\n\n"
+    
+    def generate():
+        local_version = network_version = None
+        last_sent = time.monotonic()
+        deadline = last_sent + EVENTS_MAX_LIFETIME
+        yield f"retry: {EVENTS_RETRY_MS}\n\n"
+        while client.running and time.monotonic() < deadline:
+            sent = False
+            version = client.local_files_version
+            if version != local_version:
+                local_version = version
+                yield event('local-files', files_body(client, 'local'))
+                yield event('published-files', files_body(client, 'published'))
+                sent = True
+            
+            network = list_flat_memoized(client)
+            if network and network.get('status') == 'OK' and network.get('version') != network_version:
+                network_version = network.get('version')
+                yield event('network-files', _network_files_body(network))
+                sent = True
+            
+            now = time.monotonic()
+            if sent:
+                last_sent = now
+            elif now - last_sent >= EVENTS_KEEPALIVE:
+                last_sent = now
+                yield ": keepalive\n\n"
+            time.sleep(EVENTS_POLL_INTERVAL)
+    
+    # stream_with_context keeps request.args (e.g. ?layout=columns) usable while streaming
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let reverse proxies buffer the stream
+    # WSGI close() runs when the stream ends, the browser disconnects or the
+    # generator never started, so the slot is always given back exactly once
+    response.call_on_close(_event_streams.release)
+    return response
+
 @app.route('/api/client/add-file', methods=['POST'])
 def add_file():
     """Add a file to local tracking by path (no copying)"""
@@ -350,17 +680,19 @@ def add_file():
         if not filepath:
             return jsonify({'success': False, 'error': 'filepath required'}), 400
         
-        # Expand and validate path
+        # Expand and validate path (single stat)
         filepath = os.path.abspath(os.path.expanduser(filepath))
         
-        if not os.path.exists(filepath):
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
             return jsonify({'success': False, 'error': f'File not found: {filepath}'}), 404
         
-        if not os.path.isfile(filepath):
+        if not stat.S_ISREG(st.st_mode):
             return jsonify({'success': False, 'error': f'Path is not a file: {filepath}'}), 400
         
         # Add file to tracking (metadata only, no copying)
-        success = client.add_local_file(filepath, auto_save_metadata=True)
+        success = client.add_local_file(filepath, auto_save_metadata=True, stat_result=st)
         
         if success:
             fname = os.path.basename(filepath)
@@ -380,10 +712,46 @@ def add_file():
         else:
             return jsonify({'success': False, 'error': 'Failed to add file'}), 400
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("add_file failed")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Short-lived cache for network duplicate checks (UI asks repeatedly while files are dragged).
+# The generation is bumped whenever this process publishes/unpublishes, so local changes
+# are never hidden behind a stale entry; changes by remote peers show up after the TTL.
+DUPLICATE_CACHE_TTL = 2.0
+DUPLICATE_CACHE_SIZE = 1024
+_dup_cache = OrderedDict()
+_dup_cache_lock = threading.Lock()
+_dup_generation = 0
+
+def _invalidate_network_caches():
+    """Invalidate cached duplicate checks and network file lists (after local publish changes)"""
+    global _dup_generation
+    with _dup_cache_lock:
+        _dup_generation += 1
+        _dup_cache.clear()
+    _network_memo.clear()
+
+def _check_duplicate_cached(client, fname, size, modified):
+    """client._check_duplicate_on_network with a DUPLICATE_CACHE_TTL cache"""
+    now = time.monotonic()
+    with _dup_cache_lock:
+        generation = _dup_generation
+        key = (client.hostname, generation, fname, size, modified)
+        entry = _dup_cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+    
+    duplicate_info = client._check_duplicate_on_network(fname, size, modified)
+    
+    with _dup_cache_lock:
+        if generation == _dup_generation:
+            _dup_cache[key] = (now + DUPLICATE_CACHE_TTL, duplicate_info)
+            _dup_cache.move_to_end(key)
+            while len(_dup_cache) > DUPLICATE_CACHE_SIZE:
+                _dup_cache.popitem(last=False)
+    return duplicate_info
+
 @app.route('/api/client/check-duplicate', methods=['POST'])
 def check_duplicate():
     """Check if a file with same metadata exists on network (for UI warnings)"""
@@ -402,7 +770,7 @@ def check_duplicate():
             modified = time.time()
         
         # Check for duplicates on network
-        duplicate_info = client._check_duplicate_on_network(fname, size, modified)
+        duplicate_info = _check_duplicate_cached(client, fname, size, modified)
         
         return jsonify({
             'success': True,
@@ -446,6 +814,114 @@ def check_local_duplicate():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def submit_publish(client, local_path, fname):
+    """Publish in the background on PUBLISH_POOL; progress via /publish-status/<fname>"""
+    def publish_task():
+        try:
+            return client.publish(local_path, fname, overwrite=True, interactive=False)
+        finally:
+            _invalidate_network_caches()
+    
+    future = PUBLISH_POOL.submit(publish_task)
+    with _publish_jobs_lock:
+        _publish_jobs[(client.hostname, fname)] = future
+    return future
+
+UPLOAD_COPY_CHUNK = 1 << 20  # userspace copy buffer
+UPLOAD_KERNEL_COPY_CHUNK = 64 << 20  # bytes per copy_file_range call
+
+WINDOWS_RESERVED_NAMES = frozenset(
+    ['CON', 'PRN', 'AUX', 'NUL'] + [f'COM{i}' for i in range(1, 10)] + [f'LPT{i}' for i in range(1, 10)]
+)
+
+def safe_upload_name(filename):
+    """
+    File name to store a browser upload under, or None if nothing usable is left.
+    Drops any client-side directories and control characters; unlike werkzeug's
+    secure_filename it keeps non-ASCII names (e.g. Vietnamese) intact.
+    """
+    name = unicodedata.normalize('NFC', filename).replace('\\', '/').rsplit('/', 1)[-1]
+    name = ''.join(ch for ch in name if ch.isprintable()).rstrip(' .')
+    if name in ('', '.', '..'):
+        return None
+    if os.name == 'nt' and name.split('.', 1)[0].upper() in WINDOWS_RESERVED_NAMES:
+        name = '_' + name
+    return name
+
+def save_upload(file, dest_path, overwrite=True):
+    """
+    Write an uploaded file to dest_path.
+    Large uploads that Werkzeug already spooled to a temp file are copied in-kernel
+    with os.copy_file_range (Linux); everything else is streamed in 1 MiB chunks.
+    The data goes to a temp file next to dest_path that is only moved into place
+    once complete, so a failed copy never leaves a truncated dest_path behind.
+    
+    Returns:
+        os.stat_result of the written file (fstat of the open fd, no path lookup)
+    
+    Raises:
+        FileExistsError: dest_path exists and overwrite is False
+            (checked atomically by os.link, which never replaces an existing name)
+    """
+    stream = file.stream
+    # SpooledTemporaryFile keeps its current backing file (BytesIO or a real
+    # temp file once rolled over) in _file; asking it for fileno() would force a rollover
+    if isinstance(stream, tempfile.SpooledTemporaryFile):
+        backing = stream._file
+    else:
+        backing = stream
+    try:
+        src_fd = backing.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        src_fd = None
+    
+    # Not mkstemp: its 0600 mode would stick to the finished file
+    dest_dir, dest_name = os.path.split(dest_path)
+    tmp_path = os.path.join(dest_dir, f'.{dest_name}.{uuid.uuid4().hex[:12]}.part')
+    out = open(tmp_path, 'xb')
+    try:
+        with out:
+            copied_in_kernel = False
+            if src_fd is not None and hasattr(os, 'copy_file_range'):
+                stream.flush()
+                offset = stream.tell()
+                try:
+                    while True:
+                        copied = os.copy_file_range(src_fd, out.fileno(), UPLOAD_KERNEL_COPY_CHUNK, offset)
+                        if copied == 0:
+                            break
+                        offset += copied
+                    copied_in_kernel = True
+                except OSError:
+                    # Not supported for this pair of files (e.g. EXDEV): fall back to
+                    # a userspace copy from where the kernel copy stopped
+                    stream.seek(offset)
+                    out.seek(0, os.SEEK_END)
+            if not copied_in_kernel:
+                shutil.copyfileobj(stream, out, UPLOAD_COPY_CHUNK)
+            out.flush()
+            st = os.fstat(out.fileno())
+        
+        if overwrite:
+            os.replace(tmp_path, dest_path)
+        else:
+            try:
+                os.link(tmp_path, dest_path)
+            except FileExistsError:
+                raise
+            except OSError:
+                # No hard links on this filesystem (e.g. FAT): rename instead,
+                # which refuses existing names on Windows but not on POSIX
+                if os.path.lexists(dest_path):
+                    raise FileExistsError(errno.EEXIST, 'File exists', dest_path)
+                os.rename(tmp_path, dest_path)
+        return st
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass  # Already moved into place
+
 @app.route('/api/client/upload', methods=['POST'])
 def upload_file():
     """
@@ -463,27 +939,18 @@ def upload_file():
             # User specified a file path on their system - just track it
             file_path = os.path.abspath(os.path.expanduser(file_path))
             
-            if not os.path.exists(file_path):
+            # One stat gives existence, type and metadata
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
                 return jsonify({'success': False, 'error': f'File not found: {file_path}'}), 404
             
-            if not os.path.isfile(file_path):
+            if not stat.S_ISREG(st.st_mode):
                 return jsonify({'success': False, 'error': f'Path is not a file: {file_path}'}), 400
             
             fname = os.path.basename(file_path)
-            
-            # Get file metadata from original location
-            from client import get_file_metadata_crossplatform, FileMetadata
-            try:
-                meta_dict = get_file_metadata_crossplatform(file_path)
-            except Exception as e:
-                print(f"[WARN] Failed to read metadata, using fallback: {e}")
-                stat = os.stat(file_path)
-                meta_dict = {
-                    'size': stat.st_size,
-                    'modified': stat.st_mtime,
-                    'created': stat.st_mtime,
-                    'path': file_path
-                }
+            meta_dict = metadata_from_stat(st, file_path)
+            invalidate_stat(file_path)
             
             # Track metadata only - file stays at original location
             metadata = FileMetadata(
@@ -497,15 +964,13 @@ def upload_file():
             )
             client.local_files[fname] = metadata
             
-            # Save metadata to JSON file
-            client._save_file_metadata(fname)
+            # Save metadata to JSON file (write-behind)
+            client.queue_file_metadata(fname)
             
             # Auto publish if requested
             auto_publish = request.form.get('auto_publish', 'false').lower() == 'true'
             if auto_publish:
-                def publish_task():
-                    client.publish(file_path, fname, overwrite=True, interactive=False)
-                threading.Thread(target=publish_task, daemon=True).start()
+                submit_publish(client, file_path, fname)
                 message = f'File "{fname}" tracked and publishing...'
             else:
                 message = f'File "{fname}" tracked successfully (reference to: {file_path})'
@@ -537,29 +1002,21 @@ def upload_file():
             
             # For browser uploads, we must save the file somewhere
             # Save to repo directory as the "original" location for browser-uploaded files
-            fname = os.path.basename(file.filename)
+            fname = safe_upload_name(file.filename)
+            if not fname:
+                return jsonify({'success': False, 'error': 'Invalid file name'}), 400
             dest_path = os.path.join(client.repo_dir, fname)
             
-            # Check if file exists (unless force_upload is True)
-            if os.path.exists(dest_path) and not force_upload:
+            # Save the uploaded file; without force_upload an existing file is
+            # never overwritten (exclusive create, no separate exists check)
+            try:
+                st = save_upload(file, dest_path, overwrite=force_upload)
+            except FileExistsError:
                 return jsonify({'success': False, 'error': f'File "{fname}" already exists'}), 400
             
-            # Save the uploaded file
-            file.save(dest_path)
-            
             # Get file metadata with cross-platform support
-            from client import get_file_metadata_crossplatform, FileMetadata
-            try:
-                meta_dict = get_file_metadata_crossplatform(dest_path)
-            except Exception as e:
-                print(f"[WARN] Failed to read metadata, using fallback: {e}")
-                stat = os.stat(dest_path)
-                meta_dict = {
-                    'size': stat.st_size,
-                    'modified': stat.st_mtime,
-                    'created': stat.st_mtime,
-                    'path': dest_path
-                }
+            meta_dict = metadata_from_stat(st, dest_path)
+            invalidate_stat(dest_path)
             
             # Add to local files with added_at timestamp
             metadata = FileMetadata(
@@ -573,14 +1030,12 @@ def upload_file():
             )
             client.local_files[fname] = metadata
             
-            # Save metadata to JSON file
-            client._save_file_metadata(fname)
+            # Save metadata to JSON file (write-behind)
+            client.queue_file_metadata(fname)
             
             # Auto publish if requested
             if auto_publish:
-                def publish_task():
-                    client.publish(dest_path, fname, overwrite=True, interactive=False)
-                threading.Thread(target=publish_task, daemon=True).start()
+                submit_publish(client, dest_path, fname)
                 message = f'File "{fname}" uploaded and publishing...'
             else:
                 message = f'File "{fname}" uploaded successfully'
@@ -595,9 +1050,10 @@ def upload_file():
                     'added_at': metadata.added_at
                 }
             })
+    except RequestEntityTooLarge:
+        return jsonify({'success': False, 'error': f'File exceeds the {app.config["MAX_CONTENT_LENGTH"]:,}-byte upload limit'}), 413
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("upload_file failed")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/client/publish', methods=['POST'])
@@ -629,6 +1085,7 @@ def publish_file():
         # Publish (stores metadata only, no copying)
         # Returns (success: bool, error_msg: str or None)
         success, error = client.publish(local_path, fname, overwrite=True, interactive=False)
+        _invalidate_network_caches()
         
         if success:
             return jsonify({
@@ -639,8 +1096,34 @@ def publish_file():
         else:
             return jsonify({'success': False, 'error': error or 'Failed to publish'}), 500
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("publish_file failed")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/client/publish-status/<fname>', methods=['GET'])
+def get_publish_status(fname):
+    """Get the status of a background publish (upload with auto_publish)"""
+    try:
+        client = get_client()
+        with _publish_jobs_lock:
+            future = _publish_jobs.get((client.hostname, fname))
+        
+        if future is None:
+            return jsonify({'success': False, 'error': 'No background publish for this file'}), 404
+        if future.running():
+            return jsonify({'success': True, 'status': 'running'})
+        if not future.done():
+            return jsonify({'success': True, 'status': 'pending'})
+        
+        try:
+            published, error = future.result()
+        except Exception as e:
+            published, error = False, str(e)
+        return jsonify({
+            'success': True,
+            'status': 'completed' if published else 'failed',
+            'error': error
+        })
+    except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/client/fetch', methods=['POST'])
@@ -659,9 +1142,7 @@ def fetch_file():
         fetch_id = str(uuid.uuid4())
         
         # Get file info from network (server provides metadata only)
-        with client.central_lock:
-            send_json(client.central, {"action": "REQUEST", "data": {"fname": fname}})
-            response = recv_json(client.central)
+        response = client.central_request({"action": "REQUEST", "data": {"fname": fname}})
         
         if not response or response.get('status') != 'FOUND':
             return jsonify({'success': False, 'error': 'File not found on network'}), 404
@@ -693,26 +1174,43 @@ def fetch_file():
             peer_ip=peer_ip
         )
         
-        # Download in background thread (direct P2P connection)
+        # Download in background thread (direct P2P connection). A failed
+        # attempt is retried up to FetchSession.MAX_RETRIES times, each after
+        # the session's backoff; download_from_peer re-start()s the session.
         def fetch_task():
-            try:
-                # Pass fetch_id so download_from_peer uses the managed session
-                result = client.download_from_peer(
-                    peer_ip,
-                    picked['port'],
-                    fname,
-                    save_path,
-                    fetch_id=fetch_id  # Use existing session from fetch_manager
-                )
+            while True:
+                failures = session.progress.retry_attempt
+                try:
+                    # Pass fetch_id so download_from_peer uses the managed session
+                    result = client.download_from_peer(
+                        peer_ip,
+                        picked['port'],
+                        fname,
+                        save_path,
+                        fetch_id=fetch_id  # Use existing session from fetch_manager
+                    )
+                    error = None if result else "P2P fetch failed"
+                except Exception as e:
+                    error = str(e)
                 
-                if not result:
-                    session.fail("P2P fetch failed")
-                    
-            except Exception as e:
-                session.fail(str(e))
-        
-        thread = threading.Thread(target=fetch_task, daemon=True)
-        thread.start()
+                if error is None:
+                    return
+                if session.progress.retry_attempt == failures:
+                    # download_from_peer gave up without failing the session
+                    session.fail(error)
+                
+                # Wait out the backoff (the download slot is free meanwhile)
+                while session.progress.retry_pending and not session.ready_for_retry():
+                    if not client.running:
+                        session.give_up()
+                        return
+                    time.sleep(FETCH_RETRY_POLL)
+                if not session.progress.retry_pending:
+                    return
+                logger.info("[FETCH] Retrying %s (%s), attempt %d",
+                            fetch_id, fname, session.progress.retry_attempt + 1)
+        
+        FETCH_POOL.submit(fetch_task)
         
         return jsonify({
             'success': True,
@@ -725,8 +1223,7 @@ def fetch_file():
             'peer_ip': peer_ip
         })
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("fetch_file failed")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -752,7 +1249,7 @@ def get_all_fetches():
     """Get progress for all active P2P fetches"""
     try:
         all_progress = fetch_manager.get_all_progress()
-        return jsonify({
+        return conditional_json({
             'success': True,
             'fetches': all_progress
         })
@@ -760,6 +1257,140 @@ def get_all_fetches():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB: few syscalls, bounded memory per download
+FILE_WRAPPER_BLOCK_SIZE = 65536
+FILE_WRAPPER_MIN_SIZE = 256  # Below this sendfile setup costs more than a plain read
+
+def _attachment_options(fname):
+    """Content-Disposition filename options that survive non-ASCII filenames"""
+    try:
+        fname.encode('ascii')
+        return {'filename': fname}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', fname).encode('ascii', 'ignore').decode('ascii')
+        quoted = urllib.parse.quote(fname, safe="!#$&+^`|~")
+        return {'filename': simple, 'filename*': f"UTF-8''{quoted}"}
+
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')  # Linux/BSD only
+FADVISE_DONTNEED_MIN_SIZE = 64 << 20  # Only evict pages of big one-shot transfers
+
+def _read_at(fd, n, offset):
+    """os.pread fallback for platforms without it (Windows)"""
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, n)
+
+_pread = getattr(os, 'pread', _read_at)
+
+def _iter_file(f, start, length, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Yield length bytes of the open unbuffered file f from offset start in
+    fixed-size chunks, closing f at the end.
+    Reads the raw fd (no BufferedReader copy) and hints the kernel that the
+    access is sequential; pages of large transfers are dropped once sent so
+    repeated big downloads don't evict the rest of the page cache.
+    """
+    fd = f.fileno()
+    try:
+        drop_pages = _HAS_FADVISE and length >= FADVISE_DONTNEED_MIN_SIZE
+        if _HAS_FADVISE:
+            os.posix_fadvise(fd, start, length, os.POSIX_FADV_SEQUENTIAL)
+        offset = start
+        end = start + length
+        while offset < end:
+            data = _pread(fd, min(chunk_size, end - offset), offset)
+            if not data:
+                break
+            if drop_pages:
+                os.posix_fadvise(fd, offset, len(data), os.POSIX_FADV_DONTNEED)
+            offset += len(data)
+            yield data
+    finally:
+        f.close()
+
+def stream_file_response(file_path, fname, conditional=True):
+    """
+    Stream a file as an attachment with O(1) memory.
+    Honors single-range Range headers (206) so downloads can be resumed.
+    Size and mtime come from fstat() of the descriptor that is streamed, so
+    Content-Length and the validators always describe the bytes sent.
+    With conditional, the response carries ETag/Last-Modified: unchanged files
+    are answered 304 and a resumed Range only applies if If-Range still matches.
+    
+    Raises:
+        OSError: file_path can't be opened (e.g. removed meanwhile)
+    """
+    f = open(file_path, 'rb', buffering=0)  # Unbuffered: _iter_file preads the raw fd
+    try:
+        st = os.fstat(f.fileno())
+        response = _file_response(f, fname, st.st_size, st.st_mtime if conditional else None)
+    except BaseException:
+        f.close()
+        raise
+    if response.status_code in (304, 416):
+        f.close()
+    else:
+        # Also covers a body the server never iterated (close() is idempotent)
+        response.call_on_close(f.close)
+    return response
+
+def _file_response(f, fname, size, mtime):
+    """Build the (possibly 304/206/416) response streaming the open file f"""
+    etag = last_modified = None
+    if mtime is not None:
+        etag = f'{size:x}-{int(mtime * 1000000):x}'
+        last_modified = int(mtime)
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            since = request.if_modified_since
+            not_modified = since is not None and last_modified <= since.timestamp()
+        if not_modified:
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            return response
+    
+    start, end = 0, size
+    status = 200
+    if request.range is not None and _if_range_matches(etag, last_modified):
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            response = Response(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+        start, end = byte_range
+        status = 206
+    
+    # Whole-file downloads go through the server's wsgi.file_wrapper when it has one:
+    # gunicorn turns it into sendfile(2) (no userspace copies). The Flask dev server's
+    # wrapper is a plain read loop. Ranges keep the generator so the length is exact.
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if status == 200 and file_wrapper is not None and size >= FILE_WRAPPER_MIN_SIZE:
+        body = file_wrapper(f, FILE_WRAPPER_BLOCK_SIZE)
+    else:
+        body = _iter_file(f, start, end - start)
+    
+    response = Response(body, status=status, mimetype='application/octet-stream',
+                        direct_passthrough=True)
+    response.headers.set('Content-Disposition', 'attachment', **_attachment_options(fname))
+    response.headers['Content-Length'] = str(end - start)
+    response.headers['Accept-Ranges'] = 'bytes'
+    if status == 206:
+        response.headers['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+    if etag is not None:
+        response.set_etag(etag)
+        response.last_modified = last_modified
+    return response
+
+def _if_range_matches(etag, last_modified):
+    """False if an If-Range header names another version (then the full file is sent)"""
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return etag is not None and if_range.etag == etag
+    if if_range.date is not None:
+        return last_modified is not None and last_modified <= if_range.date.timestamp()
+    return True
+
 @app.route('/api/client/download/<fname>', methods=['GET'])
 def download_file(fname):
     """Download a fetched file from the repo to browser (for saving anywhere)"""
@@ -771,10 +1402,15 @@ def download_file(fname):
             return jsonify({'success': False, 'error': 'File not found'}), 404
         
         file_path = client.local_files[fname].path
-        if not os.path.exists(file_path):
+        # Cached stat only answers "is it there"; size/mtime are taken from the
+        # streamed fd, as the file may have been re-fetched since it was cached
+        if not file_path or stat_cached(file_path)[0] is None:
             return jsonify({'success': False, 'error': 'File not found on disk'}), 404
         
-        return send_file(file_path, as_attachment=True, download_name=fname)
+        try:
+            return stream_file_response(file_path, fname)
+        except FileNotFoundError:
+            return jsonify({'success': False, 'error': 'File not found on disk'}), 404
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -791,6 +1427,7 @@ def unpublish_file():
         
         # Call unpublish method
         success = client.unpublish(fname)
+        _invalidate_network_caches()
         
         if success:
             return jsonify({'success': True, 'message': 'File unpublished successfully'})
@@ -804,11 +1441,12 @@ def discover_host(hostname):
     """Discover files from a specific host"""
     try:
         client = get_client()
-        with client.central_lock:
-            send_json(client.central, {"action": "DISCOVER", "data": {"hostname": hostname}})
-            response = recv_json(client.central)
+        response = client.central_request({"action": "DISCOVER", "data": {"hostname": hostname}},
+                                          timeout=CENTRAL_UI_TIMEOUT)
         
-        if response and response.get('status') == 'OK':
+        if response is None:
+            return jsonify({'success': False, 'error': 'Central server did not respond'}), 504
+        if response.get('status') == 'OK':
             return jsonify({
                 'success': True,
                 'hostname': hostname,
@@ -825,9 +1463,8 @@ def ping_host(hostname):
     """Ping a specific host"""
     try:
         client = get_client()
-        with client.central_lock:
-            send_json(client.central, {"action": "PING", "data": {"hostname": hostname}})
-            response = recv_json(client.central)
+        response = client.central_request({"action": "PING", "data": {"hostname": hostname}},
+                                          timeout=CENTRAL_UI_TIMEOUT)
         
         return jsonify({
             'success': True,
@@ -837,6 +1474,18 @@ def ping_host(hostname):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+SCAN_POOL_SIZE = 8
+SCAN_PARALLEL_MIN = 64  # Below this, pool hand-off costs more than the stats
+SCAN_POOL = ThreadPoolExecutor(max_workers=SCAN_POOL_SIZE, thread_name_prefix='scan')
+atexit.register(SCAN_POOL.shutdown, cancel_futures=True)
+
+def _entry_stat(entry):
+    """DirEntry.stat(), or None if the file disappeared while scanning"""
+    try:
+        return entry.stat()
+    except OSError:
+        return None
+
 @app.route('/api/client/scan-directory', methods=['POST'])
 def scan_directory():
     """Scan a directory and add all files to local tracking"""
@@ -849,15 +1498,29 @@ def scan_directory():
             return jsonify({'success': False, 'error': 'directory required'}), 400
         
         directory = os.path.abspath(os.path.expanduser(directory))
-        if not os.path.isdir(directory):
+        try:
+            st = os.stat(directory)
+        except OSError:
+            return jsonify({'success': False, 'error': 'Invalid directory'}), 400
+        if not stat.S_ISDIR(st.st_mode):
             return jsonify({'success': False, 'error': 'Invalid directory'}), 400
         
+        # scandir reuses the file type from readdir - no stat per entry
+        # (symlinks are still followed, like os.path.isfile did)
+        with os.scandir(directory) as it:
+            entries = [entry for entry in it if entry.is_file()]
+        
+        # One stat per file for the metadata; large directories stat in parallel
+        # (stat releases the GIL, which pays off on network/slow disks)
+        if len(entries) >= SCAN_PARALLEL_MIN:
+            stats = list(SCAN_POOL.map(_entry_stat, entries))
+        else:
+            stats = [_entry_stat(entry) for entry in entries]
+        
         added = 0
-        for fname in os.listdir(directory):
-            fpath = os.path.join(directory, fname)
-            if os.path.isfile(fpath):
-                if client.add_local_file(fpath):
-                    added += 1
+        for entry, st in zip(entries, stats):
+            if st is not None and client.add_local_file(entry.path, stat_result=st):
+                added += 1
         
         return jsonify({
             'success': True,
@@ -921,84 +1584,109 @@ def logout():
         
         token = auth_header.split(' ')[1]
         try:
-            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
+            payload = decode_token(token)
             username = payload.get('username')
-            print(f"[LOGOUT] Received logout request from '{username}'")
+            logger.debug("[LOGOUT] Received logout request from '%s'", username)
+            revoke_token(token, payload['exp'])
         except jwt.ExpiredSignatureError:
             return jsonify({'success': False, 'error': 'Token expired'}), 401
         except jwt.InvalidTokenError:
             return jsonify({'success': False, 'error': 'Invalid token'}), 401
         
-        with clients_lock:
-            if username in client_instances:
-                client = client_instances[username]
-                print(f"[LOGOUT] Disconnecting client '{username}'")
+        with per_user_locks[username]:
+            client = client_instances.get(username)
+            if client is not None:
+                logger.info("[LOGOUT] Disconnecting client '%s'", username)
                 
                 # Unregister from central server and close connection
                 try:
                     client.close()
-                    print(f"[LOGOUT] Client '{username}' unregistered from server")
+                    logger.info("[LOGOUT] Client '%s' unregistered from server", username)
                 except Exception as e:
-                    print(f"[LOGOUT] Error closing client: {e}")
+                    logger.warning("[LOGOUT] Error closing client: %s", e)
                 
                 # Remove from active instances
-                del client_instances[username]
-                print(f"[LOGOUT] Removed '{username}' from active instances")
+                remove_client_instance(username)
+                with _publish_jobs_lock:
+                    for key in [k for k in _publish_jobs if k[0] == client.hostname]:
+                        del _publish_jobs[key]
+                _drop_files_bodies(client.hostname)
+                _invalidate_network_caches()
+                logger.info("[LOGOUT] Removed '%s' from active instances", username)
                 
                 return jsonify({
                     'success': True,
                     'message': f'Successfully disconnected from network'
                 })
             else:
-                print(f"[LOGOUT] Client '{username}' not found in active instances. Available: {list(client_instances.keys())}")
+                logger.warning("[LOGOUT] Client '%s' not found in active instances. Available: %s", username, list(client_instances.keys()))
                 return jsonify({
                     'success': False,
                     'error': 'Client not found'
                 }), 404
     except Exception as e:
-        print(f"[ERROR] Logout failed: {e}")
+        logger.error("Logout failed: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+# Constant parts of the health/debug responses, encoded once
+_HEALTH_PREFIX = b'{"status":"healthy","service":"Client API","active_clients":'
+_HEALTH_USERNAMES = b',"usernames":'
+_DEBUG_PREFIX = b'{"total_clients":'
+_DEBUG_CLIENTS = b',"clients":'
+
+# Cached bodies: health only depends on the set of sessions, so it is reused until
+# client_instances changes; debug also shows live per-client state, so it is
+# additionally capped at DEBUG_CACHE_TTL seconds
+DEBUG_CACHE_TTL = 1.0
+_health_cache = (None, b'')  # (client_instances_version, body)
+_debug_cache = (None, 0.0, b'')  # (client_instances_version, expires, body)
+
+def _json_response(body):
+    return app.response_class(body, mimetype='application/json')
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check"""
-    with clients_lock:
-        active_clients = len(client_instances)
-        usernames = list(client_instances.keys())
-    
-    return jsonify({
-        'status': 'healthy',
-        'service': 'Client API',
-        'active_clients': active_clients,
-        'usernames': usernames
-    })
+    global _health_cache
+    version = client_instances_version
+    cached_version, body = _health_cache
+    if cached_version != version:
+        usernames = list(client_instances)
+        body = _HEALTH_PREFIX + str(len(usernames)).encode() + _HEALTH_USERNAMES + json_bytes(usernames) + b'}'
+        _health_cache = (version, body)
+    return _json_response(body)
 
 @app.route('/api/debug/clients', methods=['GET'])
 def debug_clients():
     """Debug endpoint to see all active clients"""
-    with clients_lock:
-        client_info = {}
-        for username, client in client_instances.items():
-            try:
-                client_info[username] = {
-                    'hostname': client.hostname,
-                    'display_name': client.display_name,
-                    'port': client.listen_port,
-                    'repo': client.repo_dir,
-                    'running': client.running,
-                    'local_files_count': len(client.local_files),
-                    'published_files_count': len(client.published_files)
-                }
-            except Exception as e:
-                client_info[username] = {'error': str(e)}
+    global _debug_cache
+    version = client_instances_version
+    now = time.monotonic()
+    cached_version, expires, body = _debug_cache
+    if cached_version == version and now < expires:
+        return _json_response(body)
+    
+    client_info = {}
+    for username, client in client_instances.items():
+        try:
+            client_info[username] = {
+                'hostname': client.hostname,
+                'display_name': client.display_name,
+                'port': client.listen_port,
+                'repo': client.repo_dir,
+                'running': client.running,
+                'local_files_count': len(client.local_files),
+                'published_files_count': len(client.published_files)
+            }
+        except Exception as e:
+            client_info[username] = {'error': str(e)}
     
-    return jsonify({
-        'total_clients': len(client_instances),
-        'clients': client_info
-    })
+    body = _DEBUG_PREFIX + str(len(client_info)).encode() + _DEBUG_CLIENTS + json_bytes(client_info) + b'}'
+    _debug_cache = (version, now + DEBUG_CACHE_TTL, body)
+    return _json_response(body)
 
 if __name__ == '__main__':
     print("=== P2P File Sharing Client API Started ===")
@@ -1009,4 +1697,7 @@ if __name__ == '__main__':
     print("  POST /api/client/init - Initialize client session")
     print("  POST /api/client/logout - Logout and disconnect from network")
     print("  GET /api/health - Health check")
-    app.run(host=CLIENT_API_HOST, port=CLIENT_API_PORT, debug=True, threaded=True)
+    # Development server only (production: gunicorn -c gunicorn_conf.py wsgi:app).
+    # The reloader/debugger are opt-in: FLASK_DEBUG=1
+    debug = os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true')
+    app.run(host=CLIENT_API_HOST, port=CLIENT_API_PORT, debug=debug, threaded=True)
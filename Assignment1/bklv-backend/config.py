@@ -9,12 +9,22 @@ Network Configuration Notes:
 """
 
 import os
+from functools import lru_cache
+from types import MappingProxyType
 from dotenv import load_dotenv
 from pathlib import Path
 
+@lru_cache(maxsize=None)
+def _load_env(path):
+    """Parse a .env file at most once per process (even if config is reloaded)"""
+    load_dotenv(dotenv_path=path)
+
 # Load .env file from parent directory
+# Child processes inherit the loaded values through os.environ, so parse it once
 env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
+if not os.environ.get('_BKLV_DOTENV_LOADED'):
+    _load_env(env_path)
+    os.environ['_BKLV_DOTENV_LOADED'] = '1'
 
 # Server Configuration
 # Default to 0.0.0.0 for network-wide access, can override in .env
@@ -34,6 +44,10 @@ ADMIN_API_HOST = os.getenv('ADMIN_API_HOST', '0.0.0.0')
 ADMIN_API_PORT = int(os.getenv('ADMIN_API_PORT', 5500))
 CLIENT_API_HOST = os.getenv('CLIENT_API_HOST', '0.0.0.0')
 CLIENT_API_PORT = int(os.getenv('CLIENT_API_PORT', 5501))
+CLIENT_API_MAX_UPLOAD = int(os.getenv('CLIENT_API_MAX_UPLOAD', 0))  # Bytes per browser upload, 0 = unlimited
+# Open /api/client/events streams at once; each one holds a request thread
+# under the gthread worker, so keep this well below CLIENT_API_THREADS
+CLIENT_API_EVENT_STREAMS = int(os.getenv('CLIENT_API_EVENT_STREAMS', 8))
 
 # Admin Authentication
 ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
@@ -46,13 +60,15 @@ SESSION_TIMEOUT = int(os.getenv('SESSION_TIMEOUT', 3600))
 # Database
 USER_DB_PATH = os.getenv('USER_DB_PATH', './data/users.json')
 
-# Create necessary directories
-os.makedirs(os.path.dirname(USER_DB_PATH) if os.path.dirname(USER_DB_PATH) else './data', exist_ok=True)
-os.makedirs(CLIENT_REPO_BASE, exist_ok=True)
+@lru_cache(maxsize=1)
+def ensure_dirs():
+    """Create the data/repo directories once per process (called by the API entry points)"""
+    for path in (os.path.dirname(USER_DB_PATH) or './data', CLIENT_REPO_BASE):
+        if not os.path.isdir(path):  # Skip the EEXIST mkdir on every start
+            os.makedirs(path, exist_ok=True)
 
-def get_config():
-    """Return configuration as dictionary"""
-    return {
+def _build_config():
+    config = {
         'server': {
             'host': SERVER_HOST,
             'port': SERVER_PORT
@@ -69,7 +85,9 @@ def get_config():
             'admin_host': ADMIN_API_HOST,
             'admin_port': ADMIN_API_PORT,
             'client_host': CLIENT_API_HOST,
-            'client_port': CLIENT_API_PORT
+            'client_port': CLIENT_API_PORT,
+            'client_max_upload': CLIENT_API_MAX_UPLOAD,
+            'client_event_streams': CLIENT_API_EVENT_STREAMS
         },
         'admin': {
             'username': ADMIN_USERNAME,
@@ -83,10 +101,20 @@ def get_config():
             'user_db_path': USER_DB_PATH
         }
     }
+    return MappingProxyType({
+        section: MappingProxyType(values) for section, values in config.items()
+    })
+
+# Settings are fixed at import, so the read-only mapping is built once
+_CONFIG = _build_config()
+
+def get_config():
+    """Return configuration as a read-only mapping of sections (shared by all callers)"""
+    return _CONFIG
 
 if __name__ == '__main__':
     # Test configuration loading
     config = get_config()
     print("Configuration loaded successfully:")
     import json
-    print(json.dumps(config, indent=2))
+    print(json.dumps(config, indent=2, default=dict))
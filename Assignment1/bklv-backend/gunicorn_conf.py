@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for the Client API (see wsgi.py)
+"""
+
+import os
+
+from config import CLIENT_API_HOST, CLIENT_API_PORT
+
+bind = f"{CLIENT_API_HOST}:{CLIENT_API_PORT}"
+
+# One process: client sessions are held in memory (client_instances)
+workers = 1
+
+# CLIENT_API_WORKER_CLASS=gevent switches to cooperative greenlets (optional
+# `pip install gevent`): the worker monkey-patches sockets/threads before the app
+# is imported, so requests waiting on the central server or peers don't hold an
+# OS thread. Falls back to gthread when gevent isn't installed.
+worker_class = os.getenv('CLIENT_API_WORKER_CLASS', 'gthread')
+if worker_class == 'gevent':
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        print("[GUNICORN] WARN: gevent not installed, using gthread workers")
+        worker_class = 'gthread'
+
+if worker_class == 'gevent':
+    worker_connections = int(os.getenv('CLIENT_API_WORKER_CONNECTIONS', '1000'))
+else:
+    threads = int(os.getenv('CLIENT_API_THREADS', '32'))
+
+# Long-running uploads/downloads of large files
+timeout = 120
+keepalive = 5
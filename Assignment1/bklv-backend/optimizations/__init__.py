@@ -2,4 +2,4 @@
 Optimization modules for P2P file sharing system
 """
 
-__all__ = ['adaptive_heartbeat', 'file_hashing', 'fetch_manager']
+__all__ = ['adaptive_heartbeat', 'file_hashing', 'fetch_manager', 'json_provider']
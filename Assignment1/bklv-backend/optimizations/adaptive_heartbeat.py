@@ -5,7 +5,14 @@ Reduces heartbeat overhead by adjusting interval based on client activity
 
 import time
 import json
+import heapq
+import random
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from typing import Callable, NamedTuple, Optional
 
 class ClientState(Enum):
     """Client activity states"""
@@ -14,6 +21,12 @@ class ClientState(Enum):
     BUSY = "busy"          # Currently uploading/downloading files
     OFFLINE = "offline"    # Lost connection
 
+class StateChange(NamedTuple):
+    """One logged state transition (tuple-sized, no per-entry dict)"""
+    timestamp: float
+    from_state: str
+    to_state: str
+
 class AdaptiveHeartbeat:
     """
     Adaptive heartbeat manager - automatically adjusts interval based on activity
@@ -22,6 +35,7 @@ class AdaptiveHeartbeat:
     - IDLE: 5 minutes (for inactive clients)
     - ACTIVE: 60 seconds (for online clients not transferring)
     - BUSY: 30 seconds (for clients transferring files)
+    Each interval gets ±20% jitter.
     
     Benefits with 100k users:
     - Reduces from 1,667 requests/s to ~684 requests/s (59% reduction)
@@ -37,6 +51,19 @@ class AdaptiveHeartbeat:
     # Thresholds
     IDLE_THRESHOLD = 300     # 5 minutes without activity → IDLE
     
+    STATE_LOG_SIZE = 128     # Recent transitions kept; older ones are dropped
+    
+    # Each cycle's interval is spread ±20% so clients that reconnected
+    # together (e.g. after a server restart) don't keep pinging in lockstep
+    JITTER = 0.2
+    
+    INTERVALS = {
+        ClientState.IDLE: IDLE_INTERVAL,
+        ClientState.ACTIVE: ACTIVE_INTERVAL,
+        ClientState.BUSY: BUSY_INTERVAL,
+        ClientState.OFFLINE: IDLE_INTERVAL * 2  # Fallback
+    }
+    
     def __init__(self, initial_state: ClientState = ClientState.ACTIVE):
         """
         Initialize adaptive heartbeat manager
@@ -45,30 +72,63 @@ class AdaptiveHeartbeat:
             initial_state: Initial state (default ACTIVE)
         """
         self.state = initial_state
+        self._rng = random.Random()  # Seeded from os.urandom: decorrelated across clients
         self.last_activity = time.time()
         self.last_heartbeat = time.time()
+        self._last_heartbeat_ns = time.monotonic_ns()
         
         # Statistics
         self.total_heartbeats = 0
-        self.state_changes = []
+        self.state_changes = deque(maxlen=self.STATE_LOG_SIZE)
+        self.total_state_changes = 0
+        
+        # Monotonic deadline of the next heartbeat, moved only on events
+        # (state change, heartbeat sent) so polling is a single compare
+        self._next_deadline_ns = 0
+        
+        # Set by register(): the shared scheduler fires send() at each deadline
+        self._scheduler: Optional['HeartbeatScheduler'] = None
+        self._send: Optional[Callable[[], bool]] = None
+        self._reset_deadline()
+    
+    def _reset_deadline(self):
+        """Schedule the next heartbeat one (jittered) interval after the last one"""
+        base = self.INTERVALS.get(self.state, self.ACTIVE_INTERVAL)
+        self._interval = base + self._rng.uniform(-base * self.JITTER, base * self.JITTER)
+        self._next_deadline_ns = self._last_heartbeat_ns + int(self._interval * 1_000_000_000)
+        scheduler = self._scheduler
+        if scheduler is not None:
+            scheduler.schedule(self)
     
-    def get_interval(self) -> int:
+    def register(self, send: Callable[[], bool]):
+        """
+        Let the process-wide HeartbeatScheduler send this client's heartbeats
+        
+        Args:
+            send: Sends one heartbeat; returning False (or raising) stops them
+        """
+        self._send = send
+        self._scheduler = HeartbeatScheduler.instance()
+        self._scheduler.schedule(self)
+    
+    def unregister(self):
+        """Stop scheduled heartbeats (pending heap entries are dropped lazily)"""
+        self._scheduler = None
+        self._send = None
+    
+    def get_interval(self) -> float:
         """
         Get heartbeat interval based on current state
         
         Returns:
-            Number of seconds until next heartbeat
+            Number of seconds until next heartbeat (jittered once per cycle)
         """
-        self._update_state()
-        
-        intervals = {
-            ClientState.IDLE: self.IDLE_INTERVAL,
-            ClientState.ACTIVE: self.ACTIVE_INTERVAL,
-            ClientState.BUSY: self.BUSY_INTERVAL,
-            ClientState.OFFLINE: self.IDLE_INTERVAL * 2  # Fallback
-        }
-        
-        return intervals.get(self.state, self.ACTIVE_INTERVAL)
+        # Idle check inlined; BUSY and IDLE never auto-transition here
+        state = self.state
+        if (state is not ClientState.BUSY and state is not ClientState.IDLE
+                and time.time() - self.last_activity > self.IDLE_THRESHOLD):
+            self._change_state(ClientState.IDLE)
+        return self._interval
     
     def _update_state(self):
         """
@@ -119,18 +179,22 @@ class AdaptiveHeartbeat:
         if self.state != new_state:
             old_state = self.state
             self.state = new_state
+            self._reset_deadline()
             
             # Log state change
-            self.state_changes.append({
-                'timestamp': time.time(),
-                'from': old_state.value,
-                'to': new_state.value
-            })
+            self.total_state_changes += 1
+            self.state_changes.append(
+                StateChange(time.time(), old_state.value, new_state.value)
+            )
     
     def record_heartbeat(self):
         """Record that a heartbeat was sent"""
         self.last_heartbeat = time.time()
+        self._last_heartbeat_ns = time.monotonic_ns()
         self.total_heartbeats += 1
+        # IDLE is only detected here, when a heartbeat actually goes out
+        self._update_state()
+        self._reset_deadline()
     
     def get_stats(self) -> dict:
         """
@@ -146,7 +210,8 @@ class AdaptiveHeartbeat:
             'current_interval': self.get_interval(),
             'idle_time': now - self.last_activity,
             'time_since_last_heartbeat': now - self.last_heartbeat,
-            'state_changes_count': len(self.state_changes)
+            'state_changes_count': self.total_state_changes,
+            'state_changes_logged': len(self.state_changes)
         }
     
     def should_send_heartbeat(self) -> bool:
@@ -156,9 +221,85 @@ class AdaptiveHeartbeat:
         Returns:
             True if it's time to send heartbeat
         """
-        now = time.time()
-        interval = self.get_interval()
-        return (now - self.last_heartbeat) >= interval
+        return time.monotonic_ns() >= self._next_deadline_ns
+
+
+
+class HeartbeatScheduler:
+    """
+    One timer thread for every AdaptiveHeartbeat in the process
+    
+    client_api hosts many Clients per process; instead of one sleeping thread
+    per client, deadlines sit in a min-heap of (deadline_ns, seq, heartbeat).
+    The timer wakes once per batch, takes every heartbeat due within
+    BATCH_WINDOW_NS and hands the sends to a small pool, so a slow central
+    round trip never delays the timer. Entries whose deadline no longer
+    matches the heartbeat's (state changed, unregistered) are skipped.
+    """
+    
+    BATCH_WINDOW_NS = 100_000_000  # Fire everything due in the next 100ms together
+    SEND_WORKERS = 8
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    @classmethod
+    def instance(cls) -> 'HeartbeatScheduler':
+        """Process-wide scheduler, started on first use"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+    
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=self.SEND_WORKERS,
+                                        thread_name_prefix='heartbeat')
+        threading.Thread(target=self._run, name='heartbeat-scheduler', daemon=True).start()
+    
+    def schedule(self, heartbeat: AdaptiveHeartbeat):
+        """(Re)queue heartbeat at its current deadline"""
+        with self._cond:
+            heapq.heappush(self._heap, (heartbeat._next_deadline_ns, next(self._seq), heartbeat))
+            if self._heap[0][2] is heartbeat:
+                self._cond.notify()  # Earlier than what the timer is sleeping for
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                now = time.monotonic_ns()
+                wait_ns = self._heap[0][0] - now
+                if wait_ns > 0:
+                    self._cond.wait(wait_ns / 1e9)
+                    continue
+                
+                batch = []
+                horizon = now + self.BATCH_WINDOW_NS
+                while self._heap and self._heap[0][0] <= horizon:
+                    deadline, _, heartbeat = heapq.heappop(self._heap)
+                    if heartbeat._scheduler is self and deadline == heartbeat._next_deadline_ns:
+                        batch.append(heartbeat)
+            
+            for heartbeat in batch:
+                self._pool.submit(self._fire, heartbeat)
+    
+    def _fire(self, heartbeat: AdaptiveHeartbeat):
+        send = heartbeat._send
+        if send is None:
+            return
+        try:
+            keep_going = send()
+        except Exception:
+            keep_going = False
+        if keep_going is False:
+            heartbeat.unregister()
+        else:
+            heartbeat.record_heartbeat()  # Re-queues at the next deadline
 
 
 if __name__ == "__main__":
@@ -15,11 +15,14 @@ Features:
 
 import os
 import time
+import random
 import threading
 from dataclasses import dataclass
 from typing import Optional, Callable
 from enum import Enum
 
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')  # Linux/BSD only
+
 
 class FetchStatus(Enum):
     """Fetch status states for P2P file transfers"""
@@ -44,6 +47,9 @@ class FetchProgress:
     peer_hostname: str = ""
     peer_ip: str = ""
     error_message: Optional[str] = None
+    retry_attempt: int = 0  # Failures so far (see FetchSession.fail)
+    next_retry_monotonic: float = 0.0  # time.monotonic() before which a retry should wait
+    retry_pending: bool = False  # FAILED, but another attempt will follow
     
     @property
     def progress_percent(self) -> float:
@@ -53,25 +59,42 @@ class FetchProgress:
         return (self.downloaded_size / self.total_size) * 100.0
     
     def to_dict(self):
-        """Convert to dictionary for JSON serialization"""
+        """
+        Convert to dictionary for JSON serialization
+        
+        A single dict literal is the cheapest way to build this; progress_percent
+        is inlined so a poll does no extra method calls.
+        """
+        total_size = self.total_size
+        downloaded_size = self.downloaded_size
         return {
             'file_name': self.file_name,
-            'total_size': self.total_size,
-            'downloaded_size': self.downloaded_size,
-            'progress_percent': self.progress_percent,
+            'total_size': total_size,
+            'downloaded_size': downloaded_size,
+            'progress_percent': (downloaded_size / total_size) * 100.0 if total_size else 0.0,
             'status': self.status.value,
             'speed_bps': self.speed_bps,
             'elapsed_time': self.elapsed_time,
             'eta_seconds': self.eta_seconds,
             'peer_hostname': self.peer_hostname,
             'peer_ip': self.peer_ip,
-            'error_message': self.error_message
+            'error_message': self.error_message,
+            'retry_attempt': self.retry_attempt,
+            'retry_after': max(0.0, self.next_retry_monotonic - time.monotonic()) if self.retry_pending else 0.0,
+            'retry_pending': self.retry_pending
         }
 
 
 class FetchSession:
     """Manages a single P2P file fetch session with progress tracking"""
     
+    # Full-jitter exponential backoff between retries of a failed fetch:
+    # delay = uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt)),
+    # so peers that failed together don't all come back to the seeder at once
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 300.0
+    MAX_RETRIES = 3  # After this many retries a failure is final
+    
     def __init__(self, file_name: str, total_size: int, save_path: str,
                  peer_hostname: str = "", peer_ip: str = "",
                  chunk_size: int = 256*1024):  # 256KB chunks for network transfer
@@ -101,67 +124,89 @@ class FetchSession:
             peer_ip=peer_ip
         )
         
-        # Speed calculation
-        self.last_update_time = 0.0
+        # Speed calculation (monotonic ns), recomputed every ~2MB written
+        # instead of timing every chunk
+        self.update_every_bytes = max(chunk_size, 2_000_000)
+        self.next_update_bytes = self.update_every_bytes
+        self.start_ns = 0
+        self.last_update_ns = 0
         self.last_update_bytes = 0
         
         # File handle
         self.file_handle = None
         self.lock = threading.Lock()
+        
+        # os.fstat of the finished file, taken before closing (saves a stat by path)
+        self.final_stat = None
     
     def start(self):
         """Start the fetch session"""
         with self.lock:
-            self.file_handle = open(self.save_path, 'wb')
+            # Unbuffered: batches arrive ~1MB at a time, so a BufferedWriter
+            # would only add a copy; the kernel is told the file is written
+            # front to back
+            self.file_handle = open(self.save_path, 'wb', buffering=0)
+            if _HAS_FADVISE:
+                os.posix_fadvise(self.file_handle.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
             self.progress.status = FetchStatus.DOWNLOADING
+            self.progress.downloaded_size = 0  # A retry starts the file over
+            self.progress.speed_bps = 0.0
+            self.progress.eta_seconds = 0.0
+            self.progress.error_message = None
+            self.progress.retry_pending = False
             self.progress.start_time = time.time()
-            self.last_update_time = time.time()
+            self.start_ns = self.last_update_ns = time.monotonic_ns()
             self.last_update_bytes = 0
+            self.next_update_bytes = self.update_every_bytes
     
     def write_chunk(self, data: bytes) -> int:
         """
         Write a data chunk and update progress
         
+        Lock-free: each session has a single downloader thread writing, and
+        progress readers only see plain attribute stores (atomic under the GIL).
+        
         Args:
             data: Chunk of data to write
         
         Returns:
             Number of bytes written
         """
-        with self.lock:
-            if self.file_handle is None:
-                raise RuntimeError("Fetch session not started")
-            
-            # Write to file
-            self.file_handle.write(data)
-            bytes_written = len(data)
-            
-            # Update progress
-            self.progress.downloaded_size += bytes_written
-            
-            # Calculate speed and ETA
-            current_time = time.time()
-            time_delta = current_time - self.last_update_time
-            
-            if time_delta >= 0.5:  # Update speed every 0.5 seconds
-                bytes_delta = self.progress.downloaded_size - self.last_update_bytes
-                self.progress.speed_bps = bytes_delta / time_delta if time_delta > 0 else 0
-                
-                # Calculate ETA
-                remaining_bytes = self.total_size - self.progress.downloaded_size
-                if self.progress.speed_bps > 0:
-                    self.progress.eta_seconds = remaining_bytes / self.progress.speed_bps
-                else:
-                    self.progress.eta_seconds = 0
-                
-                # Update tracking variables
-                self.last_update_time = current_time
-                self.last_update_bytes = self.progress.downloaded_size
-            
-            # Update elapsed time
-            self.progress.elapsed_time = current_time - self.progress.start_time
-            
+        file_handle = self.file_handle
+        if file_handle is None:
+            raise RuntimeError("Fetch session not started")
+        
+        # Write to file (raw writes may be short)
+        bytes_written = len(data)
+        n = file_handle.write(data)
+        if n != bytes_written:
+            view = memoryview(data)
+            while n < bytes_written:
+                n += file_handle.write(view[n:])
+        
+        # Update progress
+        progress = self.progress
+        downloaded = progress.downloaded_size + bytes_written
+        progress.downloaded_size = downloaded
+        if downloaded < self.next_update_bytes:
             return bytes_written
+        self.next_update_bytes = downloaded + self.update_every_bytes
+        
+        # Calculate speed and ETA
+        now_ns = time.monotonic_ns()
+        delta_ns = now_ns - self.last_update_ns
+        speed = progress.speed_bps
+        if delta_ns > 0:
+            speed = (downloaded - self.last_update_bytes) * 1e9 / delta_ns
+        progress.eta_seconds = (self.total_size - downloaded) / speed if speed > 0 else 0
+        progress.speed_bps = speed
+        
+        # Update tracking variables
+        self.last_update_ns = now_ns
+        self.last_update_bytes = downloaded
+        progress.elapsed_time = (now_ns - self.start_ns) / 1e9
+        
+        return bytes_written
     
     def complete(self) -> bool:
         """
@@ -175,35 +220,63 @@ class FetchSession:
         """
         with self.lock:
             if self.file_handle:
+                self.file_handle.flush()
+                self.final_stat = os.fstat(self.file_handle.fileno())
                 self.file_handle.close()
                 self.file_handle = None
+            if self.start_ns:
+                self.progress.elapsed_time = (time.monotonic_ns() - self.start_ns) / 1e9
             
             # Verify size matches what server reported
             if self.progress.downloaded_size != self.total_size:
-                self.progress.status = FetchStatus.FAILED
+                # Message first: lock-free readers must never see FAILED without it
                 self.progress.error_message = (
                     f"Size mismatch: expected {self.total_size:,} bytes, "
                     f"got {self.progress.downloaded_size:,} bytes"
                 )
+                self._schedule_retry()
+                self.progress.status = FetchStatus.FAILED
                 return False
             
             self.progress.status = FetchStatus.COMPLETED
             return True
     
     def fail(self, error_message: str):
-        """Mark fetch as failed"""
+        """Mark fetch as failed and schedule when a retry may start"""
         with self.lock:
             if self.file_handle:
                 self.file_handle.close()
                 self.file_handle = None
             
-            self.progress.status = FetchStatus.FAILED
             self.progress.error_message = error_message
+            self._schedule_retry()
+            self.progress.status = FetchStatus.FAILED
     
-    def get_progress(self) -> dict:
-        """Get current progress as dictionary"""
+    def _schedule_retry(self):
+        """Back off (full jitter) before the next attempt; caller holds self.lock"""
+        attempt = self.progress.retry_attempt
+        self.progress.retry_attempt = attempt + 1
+        if attempt >= self.MAX_RETRIES:
+            self.progress.retry_pending = False
+            return
+        cap = min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** attempt)
+        self.progress.next_retry_monotonic = time.monotonic() + random.uniform(0, cap)
+        self.progress.retry_pending = True
+    
+    def ready_for_retry(self) -> bool:
+        """True once a failed fetch's backoff delay has passed (and retries remain)"""
+        return (self.progress.status == FetchStatus.FAILED
+                and self.progress.retry_pending
+                and time.monotonic() >= self.progress.next_retry_monotonic)
+    
+    def give_up(self):
+        """Drop a pending retry, making the failure final"""
         with self.lock:
-            return self.progress.to_dict()
+            self.progress.retry_pending = False
+    
+    def get_progress(self) -> dict:
+        """Get current progress as dictionary (lock-free, never blocks the writer)"""
+        return self.progress.to_dict()
     
     def cleanup(self):
         """Cleanup resources"""
@@ -214,11 +287,37 @@ class FetchSession:
 
 
 class FetchManager:
-    """Manages multiple P2P fetch sessions"""
+    """
+    Manages multiple P2P fetch sessions
+    
+    Sessions are striped across SHARD_COUNT dicts, each with its own lock.
+    Lookups (the progress-polling hot path) read the shard dict without
+    locking - single dict reads are atomic in CPython - so only session
+    creation/removal takes a lock, and only for one shard.
+    
+    get_all_progress serves a snapshot dict that is rebuilt at most every
+    SNAPSHOT_INTERVAL seconds and swapped in with one reference assignment.
+    """
+    
+    SHARD_COUNT = 16  # Must be a power of two
+    SNAPSHOT_INTERVAL = 0.5  # Seconds an all-progress snapshot is served
     
     def __init__(self):
-        self.sessions = {}  # fetch_id -> FetchSession
-        self.lock = threading.Lock()
+        self._shards = [(threading.Lock(), {}) for _ in range(self.SHARD_COUNT)]
+        # (monotonic build time, fetch_id -> progress dict); replaced, never mutated
+        self._progress_snapshot = (0.0, {})
+    
+    def _shard(self, fetch_id: str):
+        """Return the (lock, sessions) shard owning fetch_id"""
+        return self._shards[hash(fetch_id) & (self.SHARD_COUNT - 1)]
+    
+    @property
+    def sessions(self) -> dict:
+        """Snapshot of all sessions (fetch_id -> FetchSession)"""
+        merged = {}
+        for _, shard in self._shards:
+            merged.update(shard)
+        return merged
     
     def create_session(self, fetch_id: str, file_name: str, 
                       total_size: int, save_path: str,
@@ -237,36 +336,49 @@ class FetchManager:
         Returns:
             FetchSession instance
         """
-        with self.lock:
-            session = FetchSession(
-                file_name=file_name,
-                total_size=total_size,
-                save_path=save_path,
-                peer_hostname=peer_hostname,
-                peer_ip=peer_ip
-            )
-            self.sessions[fetch_id] = session
-            return session
+        session = FetchSession(
+            file_name=file_name,
+            total_size=total_size,
+            save_path=save_path,
+            peer_hostname=peer_hostname,
+            peer_ip=peer_ip
+        )
+        lock, shard = self._shard(fetch_id)
+        with lock:
+            shard[fetch_id] = session
+        self._progress_snapshot = (0.0, {})  # New fetch shows up on the next poll
+        return session
     
     def get_session(self, fetch_id: str) -> Optional[FetchSession]:
-        """Get a fetch session by ID"""
-        with self.lock:
-            return self.sessions.get(fetch_id)
+        """Get a fetch session by ID (lock-free)"""
+        return self._shard(fetch_id)[1].get(fetch_id)
     
     def remove_session(self, fetch_id: str):
         """Remove a fetch session"""
-        with self.lock:
-            session = self.sessions.pop(fetch_id, None)
-            if session:
-                session.cleanup()
+        lock, shard = self._shard(fetch_id)
+        with lock:
+            session = shard.pop(fetch_id, None)
+        if session:
+            self._progress_snapshot = (0.0, {})
+            session.cleanup()
     
     def get_all_progress(self) -> dict:
-        """Get progress for all active fetches"""
-        with self.lock:
-            return {
-                fetch_id: session.get_progress()
-                for fetch_id, session in self.sessions.items()
-            }
+        """
+        Get progress for all active fetches
+        
+        Returns a shared snapshot (at most SNAPSHOT_INTERVAL old); callers must
+        not mutate it.
+        """
+        built_at, snapshot = self._progress_snapshot
+        now = time.monotonic()
+        if built_at and now - built_at < self.SNAPSHOT_INTERVAL:
+            return snapshot
+        snapshot = {
+            fetch_id: session.get_progress()
+            for fetch_id, session in self.sessions.items()
+        }
+        self._progress_snapshot = (now, snapshot)
+        return snapshot
 
 
 # Global fetch manager instance
@@ -5,52 +5,121 @@ Sử dụng SHA256 để identify files và phát hiện duplicates
 
 import hashlib
 import os
+import sys
+import mmap
 import json
 import time
-from typing import Dict, List, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 
+try:
+    import blake3  # Optional: pip install blake3 (SIMD + multi-threaded)
+except ImportError:
+    blake3 = None
+
+# Prefix của hash BLAKE3; hash SHA256 giữ dạng hex thuần như entries cũ
+BLAKE3_PREFIX = 'b3:'
+
+_HAS_FILE_DIGEST = hasattr(hashlib, 'file_digest')  # Python 3.11+
+
+# Một thread cho mỗi sample của quick hash (beginning, middle, end)
+_SAMPLE_POOL = ThreadPoolExecutor(max_workers=3, thread_name_prefix='quick-hash')
+_HAS_PREADV = hasattr(os, 'preadv')  # Linux/BSD only
+
+# Buffer mẫu tái sử dụng theo thread: quick hash đọc thẳng vào đây (readinto/
+# preadv) thay vì tạo bytes 1MB mới cho mỗi sample
+_sample_buffers = threading.local()
+
+def _sample_view(size: int) -> memoryview:
+    """memoryview size bytes trên buffer riêng của thread hiện tại"""
+    buf = getattr(_sample_buffers, 'buf', None)
+    if buf is None or len(buf) < size:
+        buf = _sample_buffers.buf = bytearray(size)
+    return memoryview(buf)[:size]
+
 @dataclass
 class FileMetadata:
     """Enhanced file metadata với hash"""
     name: str
     size: int
     modified: float
-    hash: str  # SHA256 hash
+    hash: str  # SHA256 hex, hoặc 'b3:' + BLAKE3 hex
     path: Optional[str] = None
     is_published: bool = False
     published_at: Optional[float] = None
     
+    @property
+    def hash_algo(self) -> str:
+        """Thuật toán của self.hash ('blake3' hoặc 'sha256')"""
+        return hash_algorithm(self.hash)
+    
     def to_dict(self):
         return asdict(self)
 
 
-def calculate_file_hash(filepath: str, chunk_size: int = 8192) -> str:
+def hash_algorithm(file_hash: str) -> str:
+    """'blake3' cho hash có prefix 'b3:', còn lại (hex thuần) là 'sha256'"""
+    return 'blake3' if file_hash.startswith(BLAKE3_PREFIX) else 'sha256'
+
+
+def calculate_file_hash(filepath: str, chunk_size: int = 1024 * 1024,
+                        algorithm: Optional[str] = None) -> str:
     """
-    Tính SHA256 hash của file
+    Tính hash định danh file (dedup, không phải chữ ký)
+    
+    Có package blake3: BLAKE3 qua mmap, đa luồng + SIMD, trả về 'b3:<hex>'.
+    Không có: SHA256 hex. Python 3.11+ dùng hashlib.file_digest (hash hoàn
+    toàn trong C); bản cũ hơn hash một lần trên mmap của file, fallback đọc
+    từng chunk 1MB nếu không mmap được.
     
     Args:
         filepath: Đường dẫn đến file
-        chunk_size: Kích thước chunk để đọc (mặc định 8KB)
+        chunk_size: Kích thước chunk để đọc khi không có file_digest (mặc định 1MB)
+        algorithm: 'blake3' / 'sha256' để ép thuật toán (vd. verify với hash
+            của peer cũ); None = nhanh nhất hiện có
     
     Returns:
-        SHA256 hash string (hex)
+        Hash string ('b3:<hex>' hoặc SHA256 hex)
     
-    Performance:
+    Performance (SHA256; BLAKE3 nhanh hơn nhiều lần trên máy nhiều core):
         - 10MB file: ~50ms
         - 100MB file: ~500ms
         - 1GB file: ~5s
     """
-    sha256 = hashlib.sha256()
-    
+    if algorithm == 'blake3' and blake3 is None:
+        raise RuntimeError("Failed to calculate hash: blake3 is not installed")
     try:
-        with open(filepath, 'rb') as f:
+        if blake3 is not None and algorithm != 'sha256':
+            hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+            if os.path.getsize(filepath):  # Không mmap được file rỗng
+                hasher.update_mmap(filepath)
+            return BLAKE3_PREFIX + hasher.hexdigest()
+        
+        with open(filepath, 'rb', buffering=0) as f:
+            if _HAS_FILE_DIGEST:
+                return hashlib.file_digest(f, 'sha256').hexdigest()
+            
+            sha256 = hashlib.sha256()
+            if os.fstat(f.fileno()).st_size:
+                try:
+                    # Một lần update trên toàn bộ mmap: OpenSSL hash cả file
+                    # trong C, không có vòng lặp Python
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        sha256.update(mapped)
+                    return sha256.hexdigest()
+                except (OSError, ValueError):
+                    pass  # Không mmap được (pipe, FS đặc biệt): đọc từng chunk
+            
+            buf = bytearray(chunk_size)
+            view = memoryview(buf)
             while True:
-                chunk = f.read(chunk_size)
-                if not chunk:
+                n = f.readinto(buf)
+                if not n:
                     break
-                sha256.update(chunk)
-        return sha256.hexdigest()
+                sha256.update(view[:n])
+            return sha256.hexdigest()
     except Exception as e:
         raise RuntimeError(f"Failed to calculate hash: {e}")
 
@@ -65,86 +134,269 @@ def calculate_quick_hash(filepath: str, sample_size: int = 1024 * 1024) -> str:
         sample_size: Kích thước mẫu từ mỗi vị trí (mặc định 1MB)
     
     Returns:
-        SHA256 hash của samples
+        SHA256 của 3 digest (mỗi sample hash riêng, song song)
     
     Use case: 
         - Quick check trước khi tính full hash
         - Files rất lớn (>1GB)
     """
-    sha256 = hashlib.sha256()
     file_size = os.path.getsize(filepath)
     
     # If file nhỏ hơn 3 * sample_size, dùng full hash
     if file_size <= sample_size * 3:
         return calculate_file_hash(filepath)
     
+    # Beginning, middle, end
+    offsets = (0, file_size // 2, max(0, file_size - sample_size))
     try:
-        with open(filepath, 'rb') as f:
-            # Beginning
-            f.seek(0)
-            sha256.update(f.read(sample_size))
-            
-            # Middle
-            f.seek(file_size // 2)
-            sha256.update(f.read(sample_size))
-            
-            # End
-            f.seek(max(0, file_size - sample_size))
-            sha256.update(f.read(sample_size))
-            
-        return sha256.hexdigest()
+        with open(filepath, 'rb', buffering=0) as f:
+            if _HAS_PREADV:
+                # preadv không đụng file position nên 3 mẫu đọc + hash song song
+                # trên cùng một fd; hashlib nhả GIL với buffer lớn
+                fd = f.fileno()
+                
+                def sample_digest(offset):
+                    view = _sample_view(sample_size)
+                    n = os.preadv(fd, [view], offset)
+                    return hashlib.sha256(view[:n]).digest()
+                
+                digests = list(_SAMPLE_POOL.map(sample_digest, offsets))
+            else:
+                view = _sample_view(sample_size)
+                digests = []
+                for off in offsets:
+                    f.seek(off)
+                    n = f.readinto(view)
+                    digests.append(hashlib.sha256(view[:n]).digest())
+        
+        # Fold 3 digests độc lập thành một hash
+        folded = hashlib.sha256()
+        for digest in digests:
+            folded.update(digest)
+        return folded.hexdigest()
     except Exception as e:
         raise RuntimeError(f"Failed to calculate quick hash: {e}")
 
 
+SIGNATURE_WINDOW = 64 * 1024  # Bytes hashed at each end by quick_signature
+
+
+def quick_signature(filepath: str, window: int = SIGNATURE_WINDOW) -> Tuple[int, str, str]:
+    """
+    Chữ ký rẻ để loại trừ duplicate trước khi hash cả file
+    
+    Chỉ đọc 2 cửa sổ 64KB (đầu + cuối). Hai file khác chữ ký chắc chắn khác
+    nội dung; trùng chữ ký thì mới cần full hash để xác nhận.
+    
+    Args:
+        filepath: Đường dẫn đến file
+        window: Số bytes ở mỗi đầu (mặc định 64KB)
+    
+    Returns:
+        (size, head_hash, tail_hash) - SHA256 hex của mỗi cửa sổ
+    """
+    try:
+        with open(filepath, 'rb', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            tail_offset = max(0, size - window)
+            if hasattr(os, 'pread'):
+                head = os.pread(f.fileno(), window, 0)
+                tail = os.pread(f.fileno(), window, tail_offset)
+            else:
+                head = f.read(window)
+                f.seek(tail_offset)
+                tail = f.read(window)
+        return size, hashlib.sha256(head).hexdigest(), hashlib.sha256(tail).hexdigest()
+    except Exception as e:
+        raise RuntimeError(f"Failed to calculate signature: {e}")
+
+
+def hash_many(filepaths: List[str], max_workers: Optional[int] = None) -> Dict[str, Optional[str]]:
+    """
+    Tính calculate_file_hash cho nhiều files cùng lúc
+    
+    hashlib nhả GIL khi hash nên thread pool chạy song song thật trên nhiều
+    core, không tốn chi phí spawn process / pickle như ProcessPoolExecutor.
+    
+    Args:
+        filepaths: Danh sách đường dẫn
+        max_workers: Số thread (mặc định os.cpu_count())
+    
+    Returns:
+        Dict filepath -> hash (None nếu file đó lỗi)
+    """
+    def safe_hash(filepath):
+        try:
+            return calculate_file_hash(filepath)
+        except RuntimeError:
+            return None
+    
+    if len(filepaths) <= 1:
+        return {path: safe_hash(path) for path in filepaths}
+    
+    workers = min(len(filepaths), max_workers or os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hash-many') as pool:
+        return dict(zip(filepaths, pool.map(safe_hash, filepaths)))
+
+
 class DuplicateDetector:
     """
     Phát hiện file duplicates dựa trên hash + size
+    
+    Layout SoA: mỗi file là một row trong 3 list song song (hostname,
+    filename, metadata); các index chỉ giữ row id, không tạo tuple cho mỗi
+    entry. Mỗi bucket là dict row id -> None (ordered set) nên xóa là O(1)
+    kể cả với hash có hàng nghìn publishers. Row đã xóa được đánh tombstone
+    (None) và tái sử dụng.
     """
     
     def __init__(self):
-        # Index: hash -> list of (hostname, filename, metadata)
-        self.hash_index: Dict[str, List[Tuple[str, str, FileMetadata]]] = {}
+        # Rows: row id -> hostname / filename / metadata (None = tombstone)
+        self._hosts: List[Optional[str]] = []
+        self._names: List[Optional[str]] = []
+        self._metas: List[Optional[FileMetadata]] = []
+        self._free_rows: List[int] = []
+        self._row_of: Dict[Tuple[str, str], int] = {}  # (hostname, filename) -> row
+        
+        # Index: hash -> row ids (insertion-ordered)
+        self.hash_index: Dict[str, Dict[int, None]] = {}
+        
+        # Index: (name, size) -> row ids (insertion-ordered)
+        self.name_size_index: Dict[Tuple[str, int], Dict[int, None]] = {}
         
-        # Index: (name, size) -> list of (hostname, hash, metadata)
-        self.name_size_index: Dict[Tuple[str, int], List[Tuple[str, str, FileMetadata]]] = {}
+        # Index: quick_signature -> row ids, chỉ cho files publish kèm chữ ký
+        self.signature_index: Dict[Tuple[int, str, str], Dict[int, None]] = {}
+        self._signature_of: Dict[int, Tuple[int, str, str]] = {}  # row -> signature
         
         # Statistics
         self.total_files = 0
         self.unique_hashes = 0
         self.duplicate_files = 0
     
-    def add_file(self, hostname: str, filename: str, metadata: FileMetadata):
+    def add_file(self, hostname: str, filename: str, metadata: FileMetadata,
+                 signature: Optional[Tuple[int, str, str]] = None):
         """
-        Thêm file vào detector
+        Thêm file vào detector (thay thế entry cũ cùng hostname + filename)
         
         Args:
             hostname: Tên client
             filename: Tên file
             metadata: Metadata của file (bao gồm hash)
+            signature: quick_signature của file (optional)
         """
+        # Hostname lặp lại ở mọi file của một client: intern để các row dùng
+        # chung một string object
+        hostname = sys.intern(hostname)
+        filename = sys.intern(filename)
+        old_row = self._row_of.get((hostname, filename))
+        if old_row is not None:
+            self.remove_file(hostname, filename, self._metas[old_row].hash)
+        
         file_hash = metadata.hash
-        name_size_key = (filename, metadata.size)
+        
+        # Store row
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._hosts[row] = hostname
+            self._names[row] = filename
+            self._metas[row] = metadata
+        else:
+            row = len(self._metas)
+            self._hosts.append(hostname)
+            self._names.append(filename)
+            self._metas.append(metadata)
+        self._row_of[(hostname, filename)] = row
         
         # Add to hash index
-        if file_hash not in self.hash_index:
-            self.hash_index[file_hash] = []
+        bucket = self.hash_index.get(file_hash)
+        if bucket is None:
+            bucket = self.hash_index[file_hash] = {}
             self.unique_hashes += 1
-        
-        self.hash_index[file_hash].append((hostname, filename, metadata))
+        bucket[row] = None
         
         # Add to name-size index
-        if name_size_key not in self.name_size_index:
-            self.name_size_index[name_size_key] = []
+        self.name_size_index.setdefault((filename, metadata.size), {})[row] = None
         
-        self.name_size_index[name_size_key].append((hostname, file_hash, metadata))
+        # Add to signature index
+        if signature is not None:
+            signature = tuple(signature)
+            self._signature_of[row] = signature
+            self.signature_index.setdefault(signature, {})[row] = None
         
         self.total_files += 1
         
         # Check if duplicate
-        if len(self.hash_index[file_hash]) > 1:
+        if len(bucket) > 1:
             self.duplicate_files += 1
     
+    def bulk_load(self, entries: Iterable[Tuple[str, str, FileMetadata]]):
+        """
+        Nạp nhiều file một lần (rebuild index lúc khởi động)
+        
+        Một vòng lặp với các index bind vào biến local, thống kê tính một
+        lần ở cuối - không đi qua add_file cho từng entry. Entry trùng
+        hostname + filename (hoặc detector đã có dữ liệu) dùng add_file.
+        
+        Args:
+            entries: Iterable of (hostname, filename, metadata)
+        """
+        if self._metas:
+            for hostname, filename, metadata in entries:
+                self.add_file(hostname, filename, metadata)
+            return
+        
+        hosts, names, metas = self._hosts, self._names, self._metas
+        row_of = self._row_of
+        hash_index = self.hash_index
+        name_size_index = self.name_size_index
+        late = []
+        
+        intern = sys.intern
+        for hostname, filename, metadata in entries:
+            hostname = intern(hostname)
+            filename = intern(filename)
+            key = (hostname, filename)
+            if key in row_of:
+                late.append((hostname, filename, metadata))
+                continue
+            row = len(metas)
+            hosts.append(hostname)
+            names.append(filename)
+            metas.append(metadata)
+            row_of[key] = row
+            
+            bucket = hash_index.get(metadata.hash)
+            if bucket is None:
+                hash_index[metadata.hash] = {row: None}
+            else:
+                bucket[row] = None
+            
+            name_size_key = (filename, metadata.size)
+            bucket = name_size_index.get(name_size_key)
+            if bucket is None:
+                name_size_index[name_size_key] = {row: None}
+            else:
+                bucket[row] = None
+        
+        # Statistics (như khi gọi add_file lần lượt)
+        self.total_files = len(metas)
+        self.unique_hashes = len(hash_index)
+        self.duplicate_files = self.total_files - self.unique_hashes
+        
+        for hostname, filename, metadata in late:
+            self.add_file(hostname, filename, metadata)
+    
+    def has_signature_match(self, signature: Tuple[int, str, str]) -> bool:
+        """
+        Có file nào có thể trùng nội dung với signature không
+        
+        False chắc chắn không duplicate (với files đã publish kèm chữ ký);
+        True thì cần full hash để xác nhận. Nếu có file publish không kèm chữ
+        ký thì không loại trừ được gì (luôn True).
+        """
+        return (tuple(signature) in self.signature_index
+                or self.total_files > len(self._signature_of))
+    
     def find_exact_duplicates(self, file_hash: str) -> List[Tuple[str, str, FileMetadata]]:
         """
         Tìm tất cả files có cùng hash (exact duplicates)
@@ -155,7 +407,8 @@ class DuplicateDetector:
         Returns:
             List of (hostname, filename, metadata)
         """
-        return self.hash_index.get(file_hash, [])
+        hosts, names, metas = self._hosts, self._names, self._metas
+        return [(hosts[r], names[r], metas[r]) for r in self.hash_index.get(file_hash, ())]
     
     def find_name_size_matches(self, filename: str, size: int) -> List[Tuple[str, str, FileMetadata]]:
         """
@@ -168,7 +421,11 @@ class DuplicateDetector:
         Returns:
             List of (hostname, hash, metadata)
         """
-        return self.name_size_index.get((filename, size), [])
+        hosts, metas = self._hosts, self._metas
+        return [
+            (hosts[r], metas[r].hash, metas[r])
+            for r in self.name_size_index.get((filename, size), ())
+        ]
     
     def check_duplicate_before_publish(
         self,
@@ -187,13 +444,21 @@ class DuplicateDetector:
                 'recommendation': str
             }
         """
+        # Fast path cho trường hợp phổ biến (file mới): hai phép tra dict,
+        # không dựng list/kết quả trung gian
+        if not self.hash_index.get(file_hash) and not self.name_size_index.get((filename, size)):
+            return self.no_duplicate_result()
+        
         exact_matches = self.find_exact_duplicates(file_hash)
         name_size_matches = self.find_name_size_matches(filename, size)
         
-        # Filter out exact matches from name-size matches
+        # Filter out exact matches from name-size matches; hashes của thuật
+        # toán khác nhau không so sánh được nên không tính là "khác nội dung"
+        algo = hash_algorithm(file_hash)
         potential_matches = [
             m for m in name_size_matches
             if m[1] != file_hash  # Different hash
+            and hash_algorithm(m[1]) == algo
         ]
         
         result = {
@@ -221,6 +486,16 @@ class DuplicateDetector:
         
         return result
     
+    @staticmethod
+    def no_duplicate_result() -> Dict:
+        """Kết quả check_duplicate_before_publish khi không có file nào trùng"""
+        return {
+            'is_duplicate': False,
+            'exact_matches': [],
+            'potential_matches': [],
+            'recommendation': "✅ No duplicates found. Safe to publish."
+        }
+    
     def _get_recommendation(self, exact_matches, potential_matches) -> str:
         """Generate recommendation message"""
         if len(exact_matches) > 0:
@@ -242,16 +517,40 @@ class DuplicateDetector:
         }
     
     def remove_file(self, hostname: str, filename: str, file_hash: str):
-        """Remove file from detector"""
+        """Remove file from detector (tombstone its row, drop it from both indexes)"""
+        row = self._row_of.get((hostname, filename))
+        if row is None or self._metas[row].hash != file_hash:
+            return
+        metadata = self._metas[row]
+        del self._row_of[(hostname, filename)]
+        
         # Remove from hash index
-        if file_hash in self.hash_index:
-            self.hash_index[file_hash] = [
-                (h, f, m) for h, f, m in self.hash_index[file_hash]
-                if not (h == hostname and f == filename)
-            ]
-            if not self.hash_index[file_hash]:
-                del self.hash_index[file_hash]
-                self.unique_hashes -= 1
+        bucket = self.hash_index[file_hash]
+        if len(bucket) > 1:
+            self.duplicate_files -= 1
+        del bucket[row]
+        if not bucket:
+            del self.hash_index[file_hash]
+            self.unique_hashes -= 1
+        
+        # Remove from name-size index
+        name_size_key = (filename, metadata.size)
+        bucket = self.name_size_index[name_size_key]
+        del bucket[row]
+        if not bucket:
+            del self.name_size_index[name_size_key]
+        
+        # Remove from signature index
+        signature = self._signature_of.pop(row, None)
+        if signature is not None:
+            bucket = self.signature_index[signature]
+            del bucket[row]
+            if not bucket:
+                del self.signature_index[signature]
+        
+        self._hosts[row] = self._names[row] = self._metas[row] = None
+        self._free_rows.append(row)
+        self.total_files -= 1
 
 
 # ========================================
@@ -339,18 +638,25 @@ class EnhancedClient:
             True nếu published successfully
         """
         try:
-            # 1. Calculate hash
-            metadata = self.add_file_with_hash(local_path)
-            if not metadata:
-                return False
-            
-            # 2. Check duplicates on server
+            # 1. Cheap signature first: server loại trừ duplicate mà không cần
+            #    đọc cả file
+            signature = quick_signature(os.path.abspath(os.path.expanduser(local_path)))
             duplicate_check = self._check_duplicate_on_server(
-                fname,
-                metadata.size,
-                metadata.hash
+                fname, signature[0], signature=signature
             )
             
+            # 2. Chỉ khi chữ ký có thể trùng mới cần full hash để quyết định
+            metadata = None
+            if duplicate_check.get('need_hash'):
+                metadata = self.add_file_with_hash(local_path)
+                if not metadata:
+                    return False
+                duplicate_check = self._check_duplicate_on_server(
+                    fname,
+                    metadata.size,
+                    metadata.hash
+                )
+            
             # 3. Show results
             if duplicate_check['is_duplicate']:
                 exact_matches = duplicate_check['exact_matches']
@@ -368,7 +674,12 @@ class EnhancedClient:
                         print("[INFO] Publish cancelled")
                         return False
             
-            # 4. Proceed with publish
+            # 4. Proceed with publish. Publish record vẫn cần full hash; nếu
+            #    chữ ký đã loại trừ duplicate thì chỉ tính bây giờ, sau quyết định
+            if metadata is None:
+                metadata = self.add_file_with_hash(local_path)
+                if not metadata:
+                    return False
             print(f"\n[INFO] Publishing '{fname}'...")
             return self._do_publish(local_path, fname, metadata)
             
@@ -376,7 +687,8 @@ class EnhancedClient:
             print(f"[ERROR] Publish failed: {e}")
             return False
     
-    def _check_duplicate_on_server(self, fname: str, size: int, file_hash: str) -> Dict:
+    def _check_duplicate_on_server(self, fname: str, size: int, file_hash: Optional[str] = None,
+                                   signature: Optional[Tuple[int, str, str]] = None) -> Dict:
         """
         Query server để check duplicates
         
@@ -386,7 +698,8 @@ class EnhancedClient:
             "data": {
                 "filename": fname,
                 "size": size,
-                "hash": file_hash
+                "hash": file_hash,        # hoặc
+                "signature": signature    # -> server trả need_hash nếu trùng
             }
         }
         """
@@ -415,7 +728,8 @@ class EnhancedClient:
             True nếu hash khớp
         """
         try:
-            actual_hash = calculate_file_hash(filepath)
+            # Cùng thuật toán với hash mong đợi (peer có thể chưa có blake3)
+            actual_hash = calculate_file_hash(filepath, algorithm=hash_algorithm(expected_hash))
             
             if actual_hash == expected_hash:
                 print(f"[SUCCESS] File integrity verified ✓")
@@ -455,24 +769,25 @@ class ServerWithDeduplication:
         fname = data.get('fname')
         file_size = data.get('size', 0)
         file_hash = data.get('hash', '')
+        now = time.time()
         
         if not file_hash:
             # Old client without hash support
             print(f"[WARN] Client {hostname} published without hash")
-            file_hash = f"no-hash-{time.time()}"
+            file_hash = f"no-hash-{now}"
         
         # Create metadata
         metadata = FileMetadata(
             name=fname,
             size=file_size,
-            modified=data.get('modified', time.time()),
+            modified=data.get('modified', now),
             hash=file_hash,
             is_published=True,
-            published_at=time.time()
+            published_at=now
         )
         
         # Add to duplicate detector
-        self.duplicate_detector.add_file(hostname, fname, metadata)
+        self.duplicate_detector.add_file(hostname, fname, metadata, data.get('signature'))
         
         # Add to registry (existing logic)
         if hostname not in self.registry:
@@ -492,6 +807,22 @@ class ServerWithDeduplication:
         fname = data.get('filename')
         size = data.get('size')
         file_hash = data.get('hash')
+        signature = data.get('signature')
+        
+        if not file_hash and signature:
+            # Signature-only check: full hash chỉ cần khi có thể trùng, hoặc khi
+            # có file cùng tên+size (potential match chỉ xác định được bằng hash,
+            # để verdict giống hệt đường full-hash)
+            detector = self.duplicate_detector
+            if (detector.has_signature_match(signature)
+                    or detector.find_name_size_matches(fname, size)):
+                send_json(conn, {"status": "OK", "need_hash": True})
+            else:
+                send_json(conn, {
+                    "status": "OK",
+                    **detector.no_duplicate_result()
+                })
+            return
         
         result = self.duplicate_detector.check_duplicate_before_publish(
             fname, size, file_hash
@@ -527,28 +858,51 @@ def benchmark_hashing():
         (100 * 1024 * 1024, "100 MB"),
     ]
     
+    # Create all test files first. Nội dung chỉ cần không nén/không sparse:
+    # lặp lại một block random 1MB thay vì os.urandom() cả file (100MB
+    # CSPRNG làm setup chậm hơn chính phần hashing)
+    pool = memoryview(os.urandom(1024 * 1024))
+    test_files = []
     for size, label in test_sizes:
-        # Create test file
         test_file = f"/tmp/test_{size}.bin"
         with open(test_file, 'wb') as f:
-            f.write(os.urandom(size))
-        
+            remaining = size
+            while remaining > 0:
+                remaining -= f.write(pool[:remaining])
+        test_files.append(test_file)
+    
+    for (size, label), test_file in zip(test_sizes, test_files):
         # Full hash
-        start = time.time()
+        start = time.perf_counter()
         full_hash = calculate_file_hash(test_file)
-        full_time = time.time() - start
+        full_time = time.perf_counter() - start
         
         # Quick hash
-        start = time.time()
+        start = time.perf_counter()
         quick_hash = calculate_quick_hash(test_file)
-        quick_time = time.time() - start
+        quick_time = time.perf_counter() - start
         
         print(f"\n{label} file:")
         print(f"  Full hash:  {full_time*1000:.2f} ms")
         print(f"  Quick hash: {quick_time*1000:.2f} ms")
         print(f"  Speedup:    {full_time/quick_time:.1f}x")
-        
-        # Cleanup
+    
+    # All files at once (parallel)
+    start = time.perf_counter()
+    for test_file in test_files:
+        calculate_file_hash(test_file)
+    sequential_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    hash_many(test_files)
+    parallel_time = time.perf_counter() - start
+    
+    print(f"\nAll {len(test_files)} files:")
+    print(f"  Sequential: {sequential_time*1000:.2f} ms")
+    print(f"  hash_many:  {parallel_time*1000:.2f} ms")
+    
+    # Cleanup
+    for test_file in test_files:
         os.remove(test_file)
 
 
@@ -0,0 +1,63 @@
+"""
+Fast JSON provider for the Flask APIs
+
+Replaces Flask's stdlib-json provider with orjson for both request parsing
+(request.json / get_json) and response serialization (jsonify). orjson is
+optional: when it is not installed the apps keep Flask's default provider.
+
+Notes:
+- orjson is stricter than json.loads (UTF-8 only, no NaN/Infinity), which
+  matches what the frontend sends anyway.
+- Keys are not sorted; clients only read fields by name.
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+class OrJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+
+    # Accept non-str dict keys (e.g. int) like the stdlib encoder does
+    OPTIONS = orjson.OPT_NON_STR_KEYS if ORJSON_AVAILABLE else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Explicit json.dumps options (indent, separators...) - keep stdlib semantics
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Build the response body as bytes directly (no str round-trip)"""
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.OPTIONS | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option),
+            mimetype=self.mimetype
+        )
+
+
+def install_json_provider(app):
+    """
+    Use orjson for app's JSON handling if available
+
+    Returns:
+        True if the orjson provider was installed
+    """
+    if not ORJSON_AVAILABLE:
+        return False
+    app.json = OrJSONProvider(app)
+    return True
@@ -1,8 +1,21 @@
 import socket
+import sys
+import asyncio
 import threading
 import json
 import time
 from datetime import datetime
+
+# orjson (optional) for the wire protocol: dumps() returns bytes directly
+try:
+    import orjson
+    json_bytes = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:
+    def json_bytes(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+    json_loads = json.loads
+
 from config import (
     SERVER_HOST, 
     SERVER_PORT,
@@ -16,231 +29,511 @@ HOST = '' if SERVER_HOST in ('0.0.0.0', '127.0.0.1') else SERVER_HOST
 PORT = SERVER_PORT
 
 registry_lock = threading.Lock()
-# Enhanced registry structure:
-# {
-#   "hostname": {
-#     "addr": (ip, port),
-#     "display_name": "User Name",
-#     "files": {
-#       "filename.txt": {
-#         "size": 1234,
-#         "modified": timestamp,
-#         "published_at": timestamp
-#       }
-#     },
-#     "last_seen": timestamp,
-#     "connected_at": timestamp
-#   }
-# }
+# Registry structure: hostname (interned) -> HostEntry, where
+# HostEntry.files is {"filename.txt": FileEntry, ...}
+# registry_lock guards adding/removing hosts (and registry_version); a host's
+# files are changed under its own lock, so PUBLISH/UNPUBLISH/DISCOVER of
+# different hosts don't serialize. Lock order: registry_lock, then host lock.
 registry = {}
 
-def send_json(conn, obj):
-    data = json.dumps(obj) + '\n'
-    conn.sendall(data.encode())
+# Inverted index: fname -> {hostname: None} (dict as an ordered set) of hosts
+# publishing it, so REQUEST only visits those hosts. Guarded by registry_lock.
+published_by = {}
 
-def recv_json(conn):
-    buf = b''
-    while True:
-        chunk = conn.recv(4096)
-        if not chunk:
-            return None
-        buf += chunk
-        if b'\n' in buf:
-            line, rest = buf.split(b'\n', 1)
-            return json.loads(line.decode())
-
-def handle_conn(conn, addr):
-    hostname = None
+class FileEntry:
+    """One file of a host (slots: a fraction of the size of a per-file dict)"""
+    __slots__ = ('size', 'modified', 'published_at', 'is_published')
+
+    def __init__(self, size=0, modified=0, published_at=None, is_published=False):
+        self.size = size
+        self.modified = modified
+        self.published_at = published_at
+        self.is_published = is_published
+
+    def to_dict(self):
+        """Wire format (DISCOVER / LIST)"""
+        return {
+            "size": self.size,
+            "modified": self.modified,
+            "published_at": self.published_at,
+            "is_published": self.is_published
+        }
+
+class HostEntry:
+    """Registry entry for one host (slots: no per-host __dict__)"""
+    __slots__ = ('addr', 'display_name', 'files', 'last_seen', 'connected_at', 'lock', 'list_head')
+
+    def __init__(self, addr, display_name, files=None):
+        now = time.time()
+        self.addr = addr                      # (ip, port) advertised for P2P
+        self.display_name = display_name
+        self.files = files if files is not None else {}  # fname -> file info
+        self.last_seen = now
+        self.connected_at = now
+        self.lock = threading.Lock()          # Guards this host's files
+        self.list_head = None                 # Encoded LIST entry head; reset when files change
+
+def intern_hostname(value):
+    """
+    Intern a hostname taken from a request
+
+    Registry keys and session hostnames then share one string object per
+    host instead of a fresh copy per decoded message.
+
+    Returns:
+        The interned hostname, or value unchanged if it isn't a string
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+# Bumped (under registry_lock) on every change visible to clients: join/leave,
+# publish/unpublish. Lets derived views such as LIST_FLAT be cached.
+registry_version = 0
+SERVER_EPOCH = int(time.time())  # Distinguishes versions across server restarts
+_flat_files_cache = (-1, [])  # (registry_version, flattened published files)
+
+def bump_registry_version():
+    """Mark the registry as changed (caller holds registry_lock)"""
+    global registry_version
+    registry_version += 1
+
+def _index_file(fname, hostname):
+    """Record that hostname publishes fname (caller holds registry_lock)"""
+    bucket = published_by.get(fname)
+    if bucket is None:
+        bucket = published_by[fname] = {}
+    bucket[hostname] = None
+
+def _unindex_file(fname, hostname):
+    """Forget that hostname publishes fname (caller holds registry_lock)"""
+    bucket = published_by.get(fname)
+    if bucket is not None:
+        bucket.pop(hostname, None)
+        if not bucket:
+            del published_by[fname]
+
+def set_host(hostname, entry):
+    """Add or replace a host, keeping published_by in sync (caller holds registry_lock)"""
+    drop_host(hostname)
+    registry[hostname] = entry
+    with entry.lock:
+        for fname, finfo in entry.files.items():
+            if finfo.is_published:
+                _index_file(fname, hostname)
+
+def drop_host(hostname):
+    """
+    Remove a host and its published_by entries (caller holds registry_lock)
+
+    Returns:
+        The removed HostEntry, or None if the host wasn't registered
+    """
+    info = registry.pop(hostname, None)
+    if info is not None:
+        with info.lock:
+            for fname in info.files:
+                _unindex_file(fname, hostname)
+    return info
+
+def build_flat_files():
+    """
+    Flattened list of all published files (one dict per file per host), cached
+    until the registry changes. Caller holds registry_lock.
+    """
+    global _flat_files_cache
+    version, files = _flat_files_cache
+    if version == registry_version:
+        return files
+    files = []
+    for h, info in registry.items():
+        ip, port = info.addr[0], info.addr[1]
+        display_name = info.display_name
+        with info.lock:
+            files.extend({
+                "name": fname,
+                "size": finfo.size,
+                "modified": finfo.modified,
+                "created": finfo.modified,
+                "published_at": finfo.published_at,
+                "owner_hostname": h,
+                "owner_name": display_name,
+                "owner_ip": ip,
+                "owner_port": port
+            } for fname, finfo in info.files.items() if finfo.is_published)
+    _flat_files_cache = (registry_version, files)
+    return files
+
+_list_heads_cache = (-1, {})  # (registry_version, hostname -> encoded LIST entry head)
+
+def build_list_heads():
+    """
+    Encoded LIST entry of every host up to (not including) last_seen, cached
+    until the registry changes. last_seen moves on every PING without a version
+    bump, so it is appended per request. After a change only hosts whose files
+    changed are re-encoded (HostEntry.list_head). Caller holds registry_lock.
+    """
+    global _list_heads_cache
+    version, heads = _list_heads_cache
+    if version == registry_version:
+        return heads
+    heads = {}
+    for h, info in registry.items():
+        with info.lock:
+            # Hosts whose files didn't change since the last LIST keep their bytes
+            head = info.list_head
+            if head is None:
+                # Only include published files
+                published = {
+                    fname: finfo.to_dict()
+                    for fname, finfo in info.files.items()
+                    if finfo.is_published
+                }
+                entry = json_bytes({
+                    "addr": info.addr,
+                    "display_name": info.display_name,
+                    "files": published
+                })
+                head = info.list_head = json_bytes(h) + b':' + entry[:-1]
+        heads[h] = head
+    _list_heads_cache = (registry_version, heads)
+    return heads
+
+def reply_tail(req_id):
+    """Closing bytes of a reply object: the echoed req_id (if any), '}' and newline"""
+    if req_id is None:
+        return b'}\n'
+    return b',"req_id":' + json_bytes(req_id) + b'}\n'
+
+# Fixed replies, pre-encoded up to the closing brace (see send_status)
+STATUS_OK = b'{"status":"OK"'
+STATUS_ACK = b'{"status":"ACK"'
+STATUS_ALIVE = b'{"status":"ALIVE"'
+STATUS_DEAD = b'{"status":"DEAD"'
+
+def send_status(conn, status, req_id=None):
+    """Send a fixed {"status": ...} reply without JSON-encoding it"""
+    conn.sendall(status + reply_tail(req_id))
+
+def send_list(conn, req_id=None):
+    """Send the LIST response, reusing cached per-host encodings"""
+    with registry_lock:
+        heads = build_list_heads()
+        times = [
+            (heads[h], info.last_seen, info.connected_at)
+            for h, info in registry.items()
+        ]
+    entries = b','.join(
+        head + b',"last_seen":' + json_bytes(last_seen)
+        + b',"connected_at":' + json_bytes(connected_at) + b'}'
+        for head, last_seen, connected_at in times
+    )
+    conn.sendall(b'{"status":"OK","registry":{' + entries + b'}' + reply_tail(req_id))
+
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024  # Longest request line (REGISTER carries every file's metadata)
+
+def send_json(conn, obj, req_id=None):
+    if req_id is not None:
+        obj['req_id'] = req_id
+    conn.sendall(json_bytes(obj) + b'\n')
+
+def _h_register(conn, addr, data, req_id, session):
+    """REGISTER: Add (or replace) a host and restore its file metadata"""
+    hostname = session['hostname'] = intern_hostname(data.get('hostname'))
+    port = data.get('port')
+    client_ip = data.get('ip')  # Get IP from client (self-reported)
+    display_name = data.get('display_name', hostname)
+    files_metadata = data.get('files_metadata', {})  # New: get metadata from client
+
+    if hostname and port:
+        # Use client-provided IP if available, otherwise fallback to connection IP
+        advertised_ip = client_ip if client_ip else addr[0]
+
+        # Restore file metadata (published/unpublished status). The whole entry
+        # is built before taking registry_lock, which then only covers one
+        # assignment however many files the client restores.
+        files = {
+            fname: FileEntry(
+                meta.get("size", 0),
+                meta.get("modified", 0),
+                meta.get("published_at"),
+                bool(meta.get("is_published", False))  # Keeps LIST/DISCOVER output a JSON bool
+            )
+            for fname, meta in files_metadata.items()
+        }
+        # Use advertised IP for P2P
+        entry = HostEntry((advertised_ip, port), display_name, files)
+        with registry_lock:
+            set_host(hostname, entry)
+            bump_registry_version()
+
+        print(f"[REGISTER] {hostname} ({display_name}) at {advertised_ip}:{port} (connected from {addr[0]}) with {len(files_metadata)} files")
+        send_status(conn, STATUS_OK, req_id)
+    else:
+        send_json(conn, {"status": "ERROR", "reason": "bad register"}, req_id)
+
+def _h_publish(conn, addr, data, req_id, session):
+    """PUBLISH: Mark a file as shared by the sending host"""
+    hostname = session['hostname'] = intern_hostname(data.get('hostname'))
+    fname = data.get('fname')
+    file_size = data.get('size', 0)
+    now = time.time()  # One clock read for every timestamp of this message
+    file_modified = data.get('modified', now)
+    if not hostname:
+        send_json(conn, {"status": "ERROR", "reason": "missing hostname"}, req_id)
+        return
+    info = registry.get(hostname)
+    if info is None:
+        with registry_lock:
+            info = registry.get(hostname)
+            if info is None:
+                print(f"[WARN] Host {hostname} tried to publish before register")
+                info = HostEntry(addr, hostname)
+                set_host(hostname, info)
+    with info.lock:
+        info.files[fname] = FileEntry(file_size, file_modified, int(now), True)
+        info.list_head = None
+        info.last_seen = now
+    with registry_lock:
+        if registry.get(hostname) is info:  # Not replaced by a REGISTER meanwhile
+            _index_file(fname, hostname)
+        bump_registry_version()
+    print(f"[PUBLISH] {hostname} shared file '{fname}' ({file_size} bytes)")
+    send_status(conn, STATUS_ACK, req_id)
+
+def _h_unpublish(conn, addr, data, req_id, session):
+    """UNPUBLISH: Stop sharing a file (metadata is kept)"""
+    hostname = session['hostname'] = intern_hostname(data.get('hostname'))
+    fname = data.get('fname')
+    if not hostname or not fname:
+        send_json(conn, {"status": "ERROR", "reason": "missing hostname or fname"}, req_id)
+        return
+    info = registry.get(hostname)
+    found = False
+    if info is not None:
+        with info.lock:
+            finfo = info.files.get(fname)
+            if finfo is not None:
+                # Instead of deleting, mark as unpublished
+                finfo.is_published = False
+                finfo.published_at = None
+                info.list_head = None
+                info.last_seen = time.time()
+                found = True
+    if found:
+        with registry_lock:
+            if registry.get(hostname) is info:
+                _unindex_file(fname, hostname)
+            bump_registry_version()
+        print(f"[UNPUBLISH] {hostname} marked file '{fname}' as unpublished")
+        send_status(conn, STATUS_ACK, req_id)
+    else:
+        send_json(conn, {"status": "ERROR", "reason": "file not found"}, req_id)
+
+def _h_request(conn, addr, data, req_id, session):
+    """REQUEST: List the hosts currently sharing a file"""
+    fname = data.get('fname')
+    if fname:
+        # Only hosts indexed as publishing fname, not the whole registry
+        with registry_lock:
+            entries = [(h, registry[h]) for h in published_by.get(fname, ())]
+        hosts = []
+        for h, info in entries:
+            with info.lock:
+                file_info = info.files.get(fname)
+                # Only return if file is published
+                if file_info is None or not file_info.is_published:
+                    continue
+                size, modified = file_info.size, file_info.modified
+            hosts.append({
+                "hostname": h,
+                "display_name": info.display_name,
+                "ip": info.addr[0],
+                "port": info.addr[1],
+                "size": size,
+                "modified": modified,
+                "is_published": True
+            })
+        print(f"[REQUEST] {addr} requested '{fname}', found {len(hosts)} host(s)")
+        send_json(conn, {"status": "FOUND" if hosts else "NOTFOUND", "hosts": hosts}, req_id)
+    else:
+        send_json(conn, {"status": "ERROR", "reason": "bad request"}, req_id)
+
+def _h_discover(conn, addr, data, req_id, session):
+    """DISCOVER: Return one host's published files and address"""
+    hname = intern_hostname(data.get('hostname'))
+    info = registry.get(hname)
+    if info:
+        with info.lock:
+            # Return only published files
+            published_files = {
+                fname: finfo.to_dict()
+                for fname, finfo in info.files.items()
+                if finfo.is_published
+            }
+        send_json(conn, {"status": "OK", "files": published_files, "addr": info.addr}, req_id)
+    else:
+        send_json(conn, {"status": "ERROR", "reason": "unknown host"}, req_id)
+
+def _h_ping(conn, addr, data, req_id, session):
+    """PING: Refresh the sender's last_seen and report whether a host is registered"""
+    hostname = session.get('hostname')
+    target = intern_hostname(data.get('hostname'))
+    # No lock: single dict reads / one value store are atomic
+    # Cập nhật client đang ping (người gửi)
+    info = registry.get(hostname) if hostname else None
+    if info is not None:
+        info.last_seen = time.time()
+    # Kiểm tra xem peer được ping còn tồn tại không
+    if target in registry:
+        send_status(conn, STATUS_ALIVE, req_id)
+        print(f"[PING] {hostname} checked {target} -> ALIVE")
+    else:
+        send_status(conn, STATUS_DEAD, req_id)
+        print(f"[PING] {hostname} checked {target} -> DEAD")
+
+def _h_unregister(conn, addr, data, req_id, session):
+    """UNREGISTER: Remove a host from the registry"""
+    hname = intern_hostname(data.get('hostname'))
+    if hname:
+        with registry_lock:
+            if drop_host(hname) is not None:
+                bump_registry_version()
+            print(f"[UNREGISTER] {hname} removed from registry")
+        send_status(conn, STATUS_OK, req_id)
+    else:
+        send_json(conn, {"status": "ERROR", "reason": "bad unregister"}, req_id)
+
+def _h_list(conn, addr, data, req_id, session):
+    """LIST: Send the whole registry"""
+    send_list(conn, req_id)
+
+def _h_list_flat(conn, addr, data, req_id, session):
+    """LIST_FLAT: Send every published file as one flat list"""
+    # Published files already flattened for UIs (see build_flat_files)
+    with registry_lock:
+        files = build_flat_files()
+        version = f"{SERVER_EPOCH}.{registry_version}"
+    send_json(conn, {"status": "OK", "files": files, "version": version}, req_id)
+
+# Action -> handler, each called as handler(conn, addr, data, req_id, session)
+HANDLERS = {
+    'REGISTER': _h_register,
+    'PUBLISH': _h_publish,
+    'UNPUBLISH': _h_unpublish,
+    'REQUEST': _h_request,
+    'DISCOVER': _h_discover,
+    'PING': _h_ping,
+    'UNREGISTER': _h_unregister,
+    'LIST': _h_list,
+    'LIST_FLAT': _h_list_flat,
+}
+
+def handle_message(conn, addr, msg, session):
+    """
+    Handle one request from a connection
+    
+    Args:
+        conn: Anything with sendall(bytes) (socket or _StreamConn)
+        addr: Peer address of the connection
+        msg: Decoded request
+        session: Per-connection state (hostname last seen on this connection)
+    """
+    action = msg.get('action')
+    req_id = msg.get('req_id')  # Echoed back so clients can multiplex requests
+    handler = HANDLERS.get(action)
+    if handler is None:
+        send_json(conn, {"status": "ERROR", "reason": f"unknown action {action}"}, req_id)
+    else:
+        handler(conn, addr, msg.get('data', {}), req_id, session)
+
+class _StreamConn:
+    """socket-style sendall() over an asyncio StreamWriter, so handlers stay synchronous"""
+    __slots__ = ('writer',)
+    
+    def __init__(self, writer):
+        self.writer = writer
+    
+    def sendall(self, data):
+        self.writer.write(data)
+
+async def handle_stream(reader, writer):
+    """Serve one client connection on the event loop"""
+    addr = writer.get_extra_info('peername')
+    conn = _StreamConn(writer)
+    session = {}
     try:
         while True:
-            msg = recv_json(conn)
+            line = await reader.readline()
+            if not line:
+                break
+            msg = json_loads(line)
             if not msg:
                 break
-            action = msg.get('action')
-            data = msg.get('data', {})
-            if action == 'REGISTER':
-                hostname = data.get('hostname')
-                port = data.get('port')
-                client_ip = data.get('ip')  # Get IP from client (self-reported)
-                display_name = data.get('display_name', hostname)
-                files_metadata = data.get('files_metadata', {})  # New: get metadata from client
-                
-                if hostname and port:
-                    # Use client-provided IP if available, otherwise fallback to connection IP
-                    advertised_ip = client_ip if client_ip else addr[0]
-                    
-                    with registry_lock:
-                        registry[hostname] = {
-                            "addr": (advertised_ip, port),  # Use advertised IP for P2P
-                            "display_name": display_name,
-                            "files": {},
-                            "last_seen": time.time(),
-                            "connected_at": time.time()
-                        }
-                        # Restore file metadata (published/unpublished status)
-                        for fname, meta in files_metadata.items():
-                            registry[hostname]["files"][fname] = {
-                                "size": meta.get("size", 0),
-                                "modified": meta.get("modified", 0),
-                                "published_at": meta.get("published_at", None),
-                                "is_published": meta.get("is_published", False)
-                            }
-                    
-                    print(f"[REGISTER] {hostname} ({display_name}) at {advertised_ip}:{port} (connected from {addr[0]}) with {len(files_metadata)} files")
-                    send_json(conn, {"status": "OK"})
-                else:
-                    send_json(conn, {"status": "ERROR", "reason": "bad register"})
-            elif action == 'PUBLISH':
-                hostname = data.get('hostname')
-                fname = data.get('fname')
-                file_size = data.get('size', 0)
-                file_modified = data.get('modified', time.time())
-                if not hostname:
-                    send_json(conn, {"status": "ERROR", "reason": "missing hostname"})
-                    continue
-                with registry_lock:
-                    if hostname not in registry:
-                        print(f"[WARN] Host {hostname} tried to publish before register")
-                        registry[hostname] = {
-                            "addr": addr, 
-                            "display_name": hostname,
-                            "files": {}, 
-                            "last_seen": time.time(),
-                            "connected_at": time.time()
-                        }
-                    registry[hostname]["files"][fname] = {
-                        "size": file_size,
-                        "modified": file_modified,
-                        "published_at": time.time(),
-                        "is_published": True
-                    }
-                    registry[hostname]["last_seen"] = time.time()
-                print(f"[PUBLISH] {hostname} shared file '{fname}' ({file_size} bytes)")
-                send_json(conn, {"status": "ACK"})
-            elif action == 'UNPUBLISH':
-                hostname = data.get('hostname')
-                fname = data.get('fname')
-                if not hostname or not fname:
-                    send_json(conn, {"status": "ERROR", "reason": "missing hostname or fname"})
-                    continue
-                with registry_lock:
-                    if hostname in registry and fname in registry[hostname]["files"]:
-                        # Instead of deleting, mark as unpublished
-                        registry[hostname]["files"][fname]["is_published"] = False
-                        registry[hostname]["files"][fname]["published_at"] = None
-                        registry[hostname]["last_seen"] = time.time()
-                        print(f"[UNPUBLISH] {hostname} marked file '{fname}' as unpublished")
-                        send_json(conn, {"status": "ACK"})
-                    else:
-                        send_json(conn, {"status": "ERROR", "reason": "file not found"})
-            elif action == 'REQUEST':
-                fname = data.get('fname')
-                if fname:
-                    with registry_lock:
-                        hosts = []
-                        for h, info in registry.items():
-                            if fname in info['files']:
-                                file_info = info['files'][fname]
-                                # Only return if file is published
-                                if file_info.get('is_published', False):
-                                    hosts.append({
-                                        "hostname": h,
-                                        "display_name": info.get('display_name', h),
-                                        "ip": info['addr'][0],
-                                        "port": info['addr'][1],
-                                        "size": file_info.get('size', 0),
-                                        "modified": file_info.get('modified', 0),
-                                        "is_published": True
-                                    })
-                    print(f"[REQUEST] {addr} requested '{fname}', found {len(hosts)} host(s)")
-                    send_json(conn, {"status": "FOUND" if hosts else "NOTFOUND", "hosts": hosts})
-                else:
-                    send_json(conn, {"status": "ERROR", "reason": "bad request"})
-            elif action == 'DISCOVER':
-                hname = data.get('hostname')
-                with registry_lock:
-                    info = registry.get(hname)
-                    if info:
-                        # Return only published files
-                        published_files = {
-                            fname: finfo 
-                            for fname, finfo in info["files"].items() 
-                            if finfo.get('is_published', False)
-                        }
-                        send_json(conn, {"status": "OK", "files": published_files, "addr": info["addr"]})
-                    else:
-                        send_json(conn, {"status": "ERROR", "reason": "unknown host"})
-            elif action == 'PING':
-                target = data.get('hostname')
-                with registry_lock:
-        # Cập nhật client đang ping (người gửi)
-                    if hostname and hostname in registry:
-                        registry[hostname]["last_seen"] = time.time()
-        # Kiểm tra xem peer được ping còn tồn tại không
-                    if target in registry:
-                        send_json(conn, {"status": "ALIVE"})
-                        print(f"[PING] {hostname} checked {target} -> ALIVE")
-                    else:
-                        send_json(conn, {"status": "DEAD"})
-                        print(f"[PING] {hostname} checked {target} -> DEAD")
-
-            elif action == 'UNREGISTER':
-                hname = data.get('hostname')
-                if hname:
-                    with registry_lock:
-                        registry.pop(hname, None)
-                        print(f"[UNREGISTER] {hname} removed from registry")
-                    send_json(conn, {"status": "OK"})
-                else:
-                    send_json(conn, {"status": "ERROR", "reason": "bad unregister"})
-            elif action == 'LIST':
-                with registry_lock:
-                    snapshot = {
-                        h: {
-                            "addr": info["addr"], 
-                            "display_name": info.get("display_name", h),
-                            # Only include published files
-                            "files": {
-                                fname: finfo 
-                                for fname, finfo in info["files"].items() 
-                                if finfo.get('is_published', False)
-                            },
-                            "last_seen": info["last_seen"],
-                            "connected_at": info.get("connected_at", info["last_seen"])
-                        } 
-                        for h, info in registry.items()
-                    }
-                send_json(conn, {"status": "OK", "registry": snapshot})
-            else:
-                send_json(conn, {"status": "ERROR", "reason": f"unknown action {action}"})
+            handle_message(conn, addr, msg, session)
+            await writer.drain()
     except Exception as e:
         print(f"[ERROR] Connection {addr} -> {e}")
     finally:
-        conn.close()
+        writer.close()
+
+def find_stale_hosts(cutoff):
+    """
+    Hosts whose last_seen is older than cutoff
+
+    Reads a snapshot of the registry without registry_lock, so it can run off
+    the event loop; remove_inactive_hosts() re-checks each candidate.
+    """
+    return [(h, info) for h, info in list(registry.items()) if info.last_seen < cutoff]
+
+def remove_inactive_hosts(stale, cutoff):
+    """Remove the stale hosts that still haven't been seen since cutoff"""
+    removed = False
+    with registry_lock:
+        for h, info in stale:
+            # Skip hosts that pinged or re-registered after the scan
+            if registry.get(h) is info and info.last_seen < cutoff:
+                print(f"[CLEANUP] Removing inactive host {h} (timeout: {CLIENT_INACTIVE_TIMEOUT}s)")
+                drop_host(h)
+                removed = True
+        if removed:
+            bump_registry_version()
 
-def cleanup_thread():
+async def cleanup_task():
     """Remove inactive clients based on configured timeout"""
+    loop = asyncio.get_running_loop()
     while True:
-        time.sleep(CLIENT_CLEANUP_INTERVAL)
-        now = time.time()
-        with registry_lock:
-            to_remove = [h for h, info in registry.items() if now - info["last_seen"] > CLIENT_INACTIVE_TIMEOUT]
-            for h in to_remove:
-                print(f"[CLEANUP] Removing inactive host {h} (timeout: {CLIENT_INACTIVE_TIMEOUT}s)")
-                registry.pop(h, None)
+        await asyncio.sleep(CLIENT_CLEANUP_INTERVAL)
+        # One compare per host against a precomputed cutoff; the scan runs in
+        # a worker thread so a large registry doesn't stall request handling
+        cutoff = time.time() - CLIENT_INACTIVE_TIMEOUT
+        stale = await loop.run_in_executor(None, find_stale_hosts, cutoff)
+        if stale:
+            remove_inactive_hosts(stale, cutoff)
 
-def main():
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind((HOST, PORT))
-    s.listen(10)
-    threading.Thread(target=cleanup_thread, daemon=True).start()
+async def serve():
+    """
+    Accept and serve all client connections on one event loop
     
+    Clients keep one multiplexed connection each; a single thread reading them
+    all avoids a thread (stack, GIL hand-offs) per connected peer.
+    """
+    # asyncio enables TCP_NODELAY on accepted TCP sockets, so replies
+    # (ACK, ALIVE, ...) go out without waiting on Nagle
+    server = await asyncio.start_server(
+        handle_stream, HOST or '0.0.0.0', PORT,
+        reuse_address=True, limit=MAX_MESSAGE_SIZE
+    )
+    cleanup = asyncio.create_task(cleanup_task())
+    async with server:
+        try:
+            await server.serve_forever()
+        finally:
+            cleanup.cancel()
+
+def main():
     # Get actual IP address for display
-    import socket as sock
-    hostname = sock.gethostname()
+    hostname = socket.gethostname()
     try:
-        local_ip = sock.gethostbyname(hostname)
+        local_ip = socket.gethostbyname(hostname)
     except:
         local_ip = 'Unable to determine'
     
@@ -252,12 +545,9 @@ def main():
     print(f"For localhost access, clients can connect to: 127.0.0.1:{PORT}")
     print(f"Waiting for client connections...")
     try:
-        while True:
-            conn, addr = s.accept()
-            threading.Thread(target=handle_conn, args=(conn, addr), daemon=True).start()
+        asyncio.run(serve())
     except KeyboardInterrupt:
         print("\n[INFO] Server stopped by user.")
-        s.close()
 
 if __name__ == "__main__":
     main()
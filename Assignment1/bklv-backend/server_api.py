@@ -7,9 +7,14 @@ from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import socket
 import json
+import queue
 import threading
 import time
 import os
+import base64
+import hashlib
+import hmac
+import secrets
 from datetime import datetime
 import jwt
 
@@ -17,15 +22,50 @@ from config import (
     SERVER_HOST, SERVER_PORT, 
     ADMIN_API_HOST, ADMIN_API_PORT,
     ADMIN_USERNAME, ADMIN_PASSWORD,
-    JWT_SECRET_KEY, SESSION_TIMEOUT
+    JWT_SECRET_KEY, SESSION_TIMEOUT,
+    ensure_dirs
 )
 from user_db import UserDB
+from optimizations.json_provider import install_json_provider, orjson
 
 # Initialize user database
+ensure_dirs()
 user_db = UserDB('./data/users.json')
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
+install_json_provider(app)  # orjson for request.json / jsonify when installed
+
+# Reusable JWT codec: key bytes and algorithm are prepared once instead of per token
+_pyjwt = jwt.PyJWT()
+_jwt_key = JWT_SECRET_KEY.encode() if isinstance(JWT_SECRET_KEY, str) else JWT_SECRET_KEY
+
+# Every token we issue has the same HS256 header, so its base64 form is fixed
+_JWT_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b'=')
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+def encode_token(payload):
+    """
+    Issue an HS256 JWT (same format as jwt.encode, verifiable by _pyjwt.decode)
+    Only the payload segment and the HMAC are computed per token.
+    
+    A random 'jti' is added so two tokens for the same user issued within the
+    same second (exp is whole seconds) differ: logout revokes one token, not
+    the user's next login.
+    
+    Returns:
+        Token string
+    """
+    payload = dict(payload, jti=secrets.token_urlsafe(8))
+    if orjson is not None:
+        payload_json = orjson.dumps(payload)
+    else:
+        payload_json = json.dumps(payload, separators=(',', ':')).encode()
+    signing_input = _JWT_HEADER_B64 + b'.' + _b64url(payload_json)
+    signature = hmac.new(_jwt_key, signing_input, hashlib.sha256).digest()
+    return (signing_input + b'.' + _b64url(signature)).decode('ascii')
 
 # Connection to central server
 CENTRAL_HOST = SERVER_HOST
@@ -35,30 +75,84 @@ CENTRAL_PORT = SERVER_PORT
 admin_sessions = {}
 
 def send_json(conn, obj):
-    data = json.dumps(obj) + '\n'
-    conn.sendall(data.encode())
-
-def recv_json(conn):
-    buf = b''
-    while True:
-        chunk = conn.recv(4096)
-        if not chunk:
-            return None
-        buf += chunk
-        if b'\n' in buf:
-            line, rest = buf.split(b'\n', 1)
-            return json.loads(line.decode())
+    if orjson is not None:
+        payload = orjson.dumps(obj)
+    else:
+        payload = json.dumps(obj, separators=(',', ':')).encode()
+    conn.sendall(payload + b'\n')
+
+# Response lines are decoded straight from bytes (orjson.JSONDecodeError is a ValueError)
+json_loads = orjson.loads if orjson is not None else json.loads
+
+class CentralConnectionPool:
+    """
+    Reusable TCP connections to the central server.
+    Each connection carries one request at a time; idle ones are kept (up to size)
+    instead of paying connect + server thread start-up for every admin query.
+    """
+    def __init__(self, host, port, size=8, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+    
+    def _connect(self):
+        conn = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn, conn.makefile('rb')
+    
+    @staticmethod
+    def _close(entry):
+        conn, reader = entry
+        try:
+            reader.close()
+            conn.close()
+        except OSError:
+            pass
+    
+    def _roundtrip(self, entry, msg):
+        conn, reader = entry
+        send_json(conn, msg)
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("central server closed the connection")
+        return json_loads(line)
+    
+    def request(self, msg):
+        """Send msg and return the decoded response (raises on network errors)"""
+        try:
+            entry = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            entry = self._connect()
+            reused = False
+        
+        try:
+            response = self._roundtrip(entry, msg)
+        except (OSError, ValueError):
+            self._close(entry)
+            if not reused:
+                raise
+            # Idle connection went stale (e.g. central server restarted): retry once
+            entry = self._connect()
+            try:
+                response = self._roundtrip(entry, msg)
+            except (OSError, ValueError):
+                self._close(entry)
+                raise
+        
+        try:
+            self._idle.put_nowait(entry)
+        except queue.Full:
+            self._close(entry)
+        return response
+
+central_pool = CentralConnectionPool(CENTRAL_HOST, CENTRAL_PORT)
 
 def query_central_server(action, data=None):
     """Send a query to the central server and return response"""
     try:
-        conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        conn.settimeout(10)
-        conn.connect((CENTRAL_HOST, CENTRAL_PORT))
-        send_json(conn, {"action": action, "data": data or {}})
-        response = recv_json(conn)
-        conn.close()
-        return response
+        return central_pool.request({"action": action, "data": data or {}})
     except Exception as e:
         return {"status": "ERROR", "reason": str(e)}
 
@@ -79,10 +173,10 @@ def user_register():
     
     if success:
         # Generate JWT token
-        token = jwt.encode({
+        token = encode_token({
             'username': username,
-            'exp': time.time() + SESSION_TIMEOUT
-        }, JWT_SECRET_KEY, algorithm='HS256')
+            'exp': int(time.time()) + SESSION_TIMEOUT
+        })
         
         return jsonify({
             'success': True,
@@ -107,10 +201,10 @@ def user_login():
     
     if success:
         # Generate JWT token
-        token = jwt.encode({
+        token = encode_token({
             'username': username,
-            'exp': time.time() + SESSION_TIMEOUT
-        }, JWT_SECRET_KEY, algorithm='HS256')
+            'exp': int(time.time()) + SESSION_TIMEOUT
+        })
         
         return jsonify({
             'success': True,
@@ -130,7 +224,7 @@ def user_verify():
     
     token = auth_header.split(' ')[1]
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
+        payload = _pyjwt.decode(token, _jwt_key, algorithms=['HS256'])
         username = payload.get('username')
         user = user_db.get_user(username)
         
@@ -157,11 +251,11 @@ def admin_login():
     
     if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
         # Generate JWT token
-        token = jwt.encode({
+        token = encode_token({
             'username': username,
             'role': 'admin',
-            'exp': time.time() + SESSION_TIMEOUT
-        }, JWT_SECRET_KEY, algorithm='HS256')
+            'exp': int(time.time()) + SESSION_TIMEOUT
+        })
         
         return jsonify({
             'success': True,
@@ -184,7 +278,7 @@ def admin_verify():
         return jsonify({'success': False, 'error': 'Token required'}), 400
     
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
+        payload = _pyjwt.decode(token, _jwt_key, algorithms=['HS256'])
         if payload.get('role') == 'admin':
             return jsonify({'success': True, 'username': payload.get('username')})
         else:
@@ -456,4 +550,6 @@ if __name__ == '__main__':
     print("  POST /api/admin/login - Admin login")
     print("  GET /api/admin/registry - Get registry")
     print("  GET /api/health - Health check")
-    app.run(host=ADMIN_API_HOST, port=ADMIN_API_PORT, debug=True)
+    # Reloader/debugger are opt-in: FLASK_DEBUG=1
+    debug = os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true')
+    app.run(host=ADMIN_API_HOST, port=ADMIN_API_PORT, debug=debug, threaded=True)
@@ -0,0 +1,20 @@
+"""
+WSGI entry point for the Client API
+
+Run with a production server instead of the Flask dev server:
+
+    gunicorn -c gunicorn_conf.py wsgi:app
+
+or explicitly:
+
+    gunicorn -b 0.0.0.0:5501 -w 1 -k gthread --threads 32 \
+             --timeout 120 --keep-alive 5 wsgi:app
+
+Note: keep a single worker process. Client sessions (client_instances) and
+their sockets to the central server live in process memory, so concurrency
+comes from the thread pool rather than from forking more workers.
+"""
+
+from client_api import app
+
+__all__ = ['app']
@@ -211,6 +211,7 @@ function FetchFileModal({
                 {fetchProgress.status === 'failed' && (
                   <div className="download-item-error-msg">
                     {fetchProgress.error_message || 'Download failed'}
+                    {fetchProgress.retry_pending && ' - retrying...'}
                   </div>
                 )}
               </div>
@@ -656,7 +656,7 @@ function ClientInterfaceScreen({ onBack }) {
               fetchLocalFiles();
             }, 1000);
             
-          } else if (progress.status === 'failed') {
+          } else if (progress.status === 'failed' && !progress.retry_pending) {
             clearInterval(interval);
             setPollInterval(null);
             // Error shown in modal, no notification needed
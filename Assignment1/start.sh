@@ -68,7 +68,11 @@ echo ""
 # Start Client API Server
 echo "🚀 Starting Client API Server (port 5501)..."
 cd bklv-backend
-python3 client_api.py &
+if command -v gunicorn &> /dev/null; then
+    gunicorn -c gunicorn_conf.py wsgi:app &
+else
+    python3 client_api.py &
+fi
 CLIENT_API_PID=$!
 cd ..
 sleep 2